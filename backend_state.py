@@ -0,0 +1,62 @@
+"""Remembers which browser backend last launched successfully."""
+import json
+import os
+from datetime import datetime
+
+
+BACKENDS = ('firefox', 'chrome')
+DEFAULT_STATE_FILE = 'browser_state.json'
+
+
+class BackendState:
+    """Small JSON record of the last working backend and how long it took to launch"""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def launch_order(self, configured='auto'):
+        """Backends to try, in order.
+
+        An explicit ``browser_settings.backend`` is the only one tried;
+        with ``auto`` the last backend that worked goes first.
+        """
+        if configured and configured != 'auto':
+            if configured not in BACKENDS:
+                raise ValueError(f"Unknown browser backend '{configured}' (expected auto, {', '.join(BACKENDS)})")
+            return [configured]
+
+        last = self.state.get('last_backend')
+        if last in BACKENDS:
+            return [last] + [backend for backend in BACKENDS if backend != last]
+        return list(BACKENDS)
+
+    def record_success(self, backend, launch_seconds):
+        self.state['last_backend'] = backend
+        self.state.setdefault('backends', {})[backend] = {
+            'launch_seconds': round(launch_seconds, 3),
+            'succeeded_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._save()
+
+    def record_failure(self, backend, error):
+        if self.state.get('last_backend') == backend:
+            self.state.pop('last_backend')
+        self.state.setdefault('backends', {}).setdefault(backend, {}).update({
+            'last_error': str(error).splitlines()[0] if str(error) else type(error).__name__,
+            'failed_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        self._save()
@@ -0,0 +1,89 @@
+"""Batched form filling: locate every field in one script call and fill them in another.
+
+Each ``find_element``/``clear``/``send_keys`` is a separate HTTP round trip to
+geckodriver or chromedriver; here the whole form costs two. Fields whose
+selector sets ``"key_events": true`` are left out of the batch so the caller
+can type into them with real key events.
+"""
+
+# Resolves one (By, value) locator in the page; shared with confirmation.py
+LOCATE_FUNCTION = """
+function locate(by, value) {
+    switch (by) {
+        case 'css selector': return document.querySelector(value);
+        case 'xpath':
+            return document.evaluate(value, document, null,
+                                     XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case 'id': return document.getElementById(value);
+        case 'name': return document.getElementsByName(value)[0] || null;
+        case 'link text':
+            return Array.prototype.find.call(document.links, function (link) {
+                return link.textContent.trim() === value;
+            }) || null;
+    }
+    return null;
+}
+function locateFirst(locators) {
+    for (var i = 0; i < locators.length; i++) {
+        var element = locate(locators[i][0], locators[i][1]);
+        if (element) return element;
+    }
+    return null;
+}
+"""
+
+LOCATE_SCRIPT = LOCATE_FUNCTION + """
+var specs = arguments[0], found = {}, missing = [];
+Object.keys(specs).forEach(function (name) {
+    var element = locateFirst(specs[name]);
+    if (element) {
+        found[name] = element;
+    } else {
+        missing.push(name);
+    }
+});
+return {found: found, missing: missing};
+"""
+
+# Uses the native value setter so frameworks that track input values (React, Vue)
+# see the change, then fires the events their handlers listen for.
+FILL_SCRIPT = """
+var actions = arguments[0], results = [];
+var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+actions.forEach(function (action) {
+    var element = action[1];
+    if (action[0] === 'check') {
+        if (!element.checked) element.click();
+        results.push(element.checked ? 'checked' : '');
+        return;
+    }
+    element.focus();
+    setter.call(element, action[2]);
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+    element.blur();
+    results.push(element.value);
+});
+return results;
+"""
+
+
+class BatchFiller:
+    """Locates and fills named form fields with one driver command each"""
+
+    def __init__(self, driver, elements):
+        self.driver = driver
+        self.elements = elements
+
+    def locate(self, names):
+        """Return ({name: element}, [missing names]) for every selector in ``names``"""
+        specs = {name: [list(locator) for locator in self.elements.locators(name)] for name in names}
+        result = self.driver.execute_script(LOCATE_SCRIPT, specs)
+        return result['found'], result['missing']
+
+    def fill(self, actions):
+        """Run fill actions in order and return each field's value afterwards.
+
+        An action is ``('set', element, value)`` or ``('check', element)``.
+        """
+        return self.driver.execute_script(FILL_SCRIPT, [list(action) for action in actions])
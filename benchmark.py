@@ -0,0 +1,141 @@
+"""End-to-end benchmark: drives PaymentAutomation headless against the local mock site.
+
+    python benchmark.py --runs 20 --render-delay 0.3 --response-delay 0.5
+
+Each run launches the browser, fills and submits the form, waits for the
+confirmation and records the transaction in a scratch journal, exactly as
+a real top-up would. The per-phase spans and the end-to-end latency
+distribution are printed at the end, along with the cold import time of
+the automation modules and their heavy dependencies.
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_site import MockTopUpServer
+from payment_automation import PaymentAutomation
+from timing import load_spans, percentile, print_summary
+
+
+def build_config(base_config, url, work_dir):
+    """Copy of config.json pointed at the mock site, with scratch output files"""
+    config = copy.deepcopy(base_config)
+    config['website']['url'] = url
+    config['browser_settings']['headless'] = True
+    config['browser_settings']['overlapped_startup'] = False
+    config['ledger'] = {'journal_file': os.path.join(work_dir, 'transactions.db'), 'export_after_save': False}
+    config['excel_file'] = os.path.join(work_dir, 'transactions.xlsx')
+    config['timings_file'] = os.path.join(work_dir, 'timings.jsonl')
+    # The mock site has no login, so there is no session to keep
+    config['session'] = {'mode': 'off'}
+    return config
+
+
+def run_once(config_path, card, amount):
+    """One full top-up; returns (succeeded, seconds)"""
+    app = PaymentAutomation(config_path, interactive=False)
+    started = time.perf_counter()
+    result = app.top_up(card['name'], amount)
+    succeeded = result['status'] == 'success'
+    if not succeeded:
+        print(f"Payment {result['status']}: {result['error'] or 'no confirmation appeared'}")
+    return succeeded, time.perf_counter() - started
+
+
+# Modules whose cold import cost is reported: the CLI fast path, the automation
+# module itself, and the heavy dependencies it loads on demand
+IMPORT_TIMED_MODULES = ['cli', 'payment_automation', 'selenium.webdriver', 'openpyxl', 'tkinter']
+IMPORT_TIMER_SCRIPT = "import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+
+
+def measure_import_times(modules=IMPORT_TIMED_MODULES, samples=5):
+    """Median cold import time in ms per module, each measured in a fresh interpreter"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        timings = []
+        for _ in range(samples):
+            completed = subprocess.run([sys.executable, '-c', IMPORT_TIMER_SCRIPT.format(module=module)],
+                                       cwd=repo_dir, capture_output=True, text=True)
+            if completed.returncode != 0:
+                break
+            timings.append(float(completed.stdout) * 1000)
+        results[module] = statistics.median(timings) if timings else None
+    return results
+
+
+def print_import_times(import_times):
+    print("Import time (fresh interpreter, median):")
+    for module, milliseconds in import_times.items():
+        print(f"  {module:<24}{'unavailable' if milliseconds is None else f'{milliseconds:.1f} ms':>14}")
+
+
+def print_distribution(label, values):
+    values = sorted(values)
+    if not values:
+        print(f"{label}: no samples")
+        return
+    mean = sum(values) / len(values)
+    print(f"{label}: n={len(values)} min={values[0]:.2f}s p50={percentile(values, 0.5):.2f}s "
+          f"p95={percentile(values, 0.95):.2f}s max={values[-1]:.2f}s mean={mean:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the payment flow against the local mock site")
+    parser.add_argument('--config', default='config.json', help="base config.json")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--amount', type=float, default=100.0)
+    parser.add_argument('--card', type=int, default=0, help="index into config cards")
+    parser.add_argument('--render-delay', type=float, default=0.0)
+    parser.add_argument('--response-delay', type=float, default=0.0)
+    parser.add_argument('--omit', nargs='*', default=[], metavar='SELECTOR')
+    parser.add_argument('--decline', action='store_true')
+    parser.add_argument('--in-place', action='store_true', help="single-page checkout: outcome shown without a page load")
+    parser.add_argument('--output', help="keep the scratch journal and timings in this directory")
+    args = parser.parse_args(argv)
+
+    with open(args.config, 'r') as file:
+        base_config = json.load(file)
+    card = base_config['cards'][args.card]
+
+    server = MockTopUpServer(render_delay=args.render_delay, response_delay=args.response_delay,
+                             omit=args.omit, decline=args.decline, in_place=args.in_place)
+    url = server.start()
+    print(f"Mock site running at {url}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.output or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        config = build_config(base_config, url, work_dir)
+        config_path = os.path.join(work_dir, 'config.json')
+        with open(config_path, 'w') as file:
+            json.dump(config, file, indent=2)
+
+        totals = []
+        failures = 0
+        try:
+            for run in range(1, args.runs + 1):
+                succeeded, seconds = run_once(config_path, card, args.amount)
+                totals.append(seconds)
+                failures += not succeeded
+                print(f"Run {run}/{args.runs}: {'ok' if succeeded else 'FAILED'} in {seconds:.2f}s")
+        finally:
+            server.stop()
+
+        print()
+        print_import_times(measure_import_times())
+        print()
+        print_summary(load_spans(config['timings_file']))
+        print()
+        print_distribution("End-to-end", totals)
+        print(f"Failures: {failures}/{args.runs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Command-line entry point for the payment automation.
+
+    python cli.py run                      # card and amount dialogs, then the top-up
+    python cli.py run --card NAME --amount 500 --no-gui --json
+    python cli.py batch JOBS.json          # several top-ups over one browser session (see jobs.py)
+    python cli.py export [--output FILE]   # write the transaction journal to Excel
+    python cli.py validate                 # check config.json without starting a browser
+    python cli.py benchmark [--runs N ...] # end-to-end benchmark against the mock site
+
+Only the standard library is imported up front; each command imports what
+it needs, so the commands that don't drive a browser never load selenium,
+tkinter or openpyxl unless they use them.
+"""
+import argparse
+import json
+import math
+import sys
+
+
+def amount_argument(value):
+    """argparse type for --amount: a finite number (the range is checked by top_up())"""
+    try:
+        amount = float(value)
+    except ValueError:
+        amount = math.nan
+    if not math.isfinite(amount):
+        raise argparse.ArgumentTypeError(f"invalid amount: {value!r}")
+    return amount
+
+
+def add_run_arguments(parser):
+    parser.add_argument('--card', help="name of the card to pay with (skips the card dialog)")
+    parser.add_argument('--amount', type=amount_argument, help="amount to top up (skips the amount dialog)")
+    parser.add_argument('--no-gui', action='store_true',
+                        help="never open a Tk window; --card and --amount are then required")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+
+
+def command_run(args):
+    """Top up with dialogs for anything not given, or fully headless with --no-gui; returns the exit code"""
+    from payment_automation import EXIT_CODES, PaymentAutomation
+
+    if args.no_gui and (args.card is None or args.amount is None):
+        print("--no-gui needs both --card and --amount")
+        return EXIT_CODES['invalid']
+
+    app = PaymentAutomation(args.config, interactive=not args.no_gui)
+    if not app.config:
+        return EXIT_CODES['invalid']
+    if args.no_gui:
+        result = app.top_up(args.card, args.amount)
+    else:
+        result = app.run(args.card, args.amount)
+
+    if result is None:
+        return EXIT_CODES['cancelled']
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"Result: {result['status']}"
+              + (f", transaction ID {result['transaction_id']}" if result['status'] == 'success' else '')
+              + (f" ({result['error']})" if result['error'] else ''))
+    return EXIT_CODES[result['status']]
+
+
+def command_batch(args):
+    """Run a job file; exit code 0 only if every job is paid (now or by an earlier run)"""
+    from jobs import load_jobs, print_results, run_jobs
+    from payment_automation import PaymentAutomation
+
+    try:
+        jobs = load_jobs(args.job_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    app = PaymentAutomation(args.config, interactive=False)
+    if not app.config:
+        return 2
+    try:
+        results = run_jobs(app, jobs)
+    except Exception as e:
+        print(f"Batch stopped: {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print_results(results)
+    all_paid = all(result['status'] == 'success' or result.get('previous_status') == 'done'
+                   for result in results)
+    return 0 if all_paid else 1
+
+
+def command_export(args):
+    from ledger import export_ledger
+    from settings import ConfigError, load_settings
+
+    try:
+        settings = load_settings(args.config)
+    except (OSError, ConfigError) as e:
+        print(f"❌ {e}")
+        return 1
+    exported = export_ledger(settings, args.output)
+    print(f"Exported {exported} transactions to {args.output or settings.excel_file}")
+    return 0
+
+
+def command_validate(args):
+    from settings import ConfigError, load_settings
+
+    try:
+        settings = load_settings(args.config)
+    except OSError as e:
+        print(f"❌ {args.config}: {e}")
+        return 1
+    except ConfigError as e:
+        for problem in e.problems:
+            print(f"❌ {problem}")
+        return 1
+    print(f"✅ {args.config} is valid ({len(settings.selectors)} selectors, {len(settings.cards)} cards, "
+          f"fingerprint {settings.fingerprint[:12]})")
+    return 0
+
+
+def command_benchmark(args):
+    import benchmark
+
+    benchmark.main(['--config', args.config] + args.benchmark_args)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FoodPanda PandaPay top-up automation")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="select a card and amount, then pay")
+    add_run_arguments(run_parser)
+    run_parser.set_defaults(handler=command_run)
+    batch_parser = subparsers.add_parser('batch', help="run the top-ups in a job file over one browser session")
+    batch_parser.add_argument('job_file', help="JSON list of {\"card\", \"amount\", optional \"key\"} jobs")
+    batch_parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    batch_parser.set_defaults(handler=command_batch)
+    export_parser = subparsers.add_parser('export', help="write the transaction journal out as an Excel workbook")
+    export_parser.add_argument('--output', help="workbook to write (default: excel_file from config)")
+    export_parser.set_defaults(handler=command_export)
+    subparsers.add_parser('validate', help="check config.json without starting a browser").set_defaults(
+        handler=command_validate)
+    # Everything after "benchmark" (--help included) goes to benchmark.py's own parser
+    subparsers.add_parser('benchmark', add_help=False, help="benchmark the payment flow against the mock site "
+                          "(options as for benchmark.py)").set_defaults(handler=command_benchmark)
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != 'benchmark':
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.benchmark_args = extra
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
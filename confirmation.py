@@ -0,0 +1,130 @@
+"""Event-driven confirmation detection.
+
+Instead of polling for the success message and then looking up the message
+and transaction ID separately, one ``execute_async_script`` call installs a
+MutationObserver that resolves as soon as a success or error marker shows
+up, and hands back the message, transaction ID and error text together.
+
+Only visible markers count, and a success marker wins over an error one.
+Just before the Pay click, mark_form_page() records which error marker (if
+any) the form page already shows. An error that was already there, same
+element and same text, is stale and ignored; one that appears or changes
+afterwards is a decline, whether a new page loaded or the checkout
+answered in place.
+"""
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from batch_fill import LOCATE_FUNCTION
+
+
+MARKER_FUNCTIONS = LOCATE_FUNCTION + """
+function text(element) {
+    return element ? (element.innerText || element.textContent || '').trim() : null;
+}
+
+function visible(element) {
+    return element && element.getClientRects().length > 0 ? element : null;
+}
+"""
+
+# Kept on the form's document: the error marker showing when Pay was clicked.
+# A page loaded after submitting starts without it.
+MARK_FORM_PAGE_SCRIPT = MARKER_FUNCTIONS + """
+var error = arguments[0].length ? visible(locateFirst(arguments[0])) : null;
+document.__paymentFormError = {element: error, text: error ? text(error) : null};
+"""
+
+WATCH_SCRIPT = MARKER_FUNCTIONS + """
+var specs = arguments[0], graceMs = arguments[1], done = arguments[arguments.length - 1];
+var observer = null, graceTimer = null, finished = false;
+
+function isNewError(error) {
+    var before = document.__paymentFormError;
+    return !before || before.element !== error || before.text !== text(error);
+}
+
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    if (graceTimer) clearTimeout(graceTimer);
+    done(result);
+}
+
+function check(graceOver) {
+    var success = visible(locateFirst(specs.success));
+    var error = specs.error.length ? visible(locateFirst(specs.error)) : null;
+    if (success) {
+        var reference = locateFirst(specs.transaction_id);
+        // The reference may render a moment after the message; give it a short grace period
+        if (reference || graceOver) {
+            finish({status: 'success', message: text(success), transaction_id: text(reference), error: null});
+        } else if (!graceTimer) {
+            graceTimer = setTimeout(function () { check(true); }, graceMs);
+        }
+    } else if (error && text(error) && isNewError(error)) {
+        finish({status: 'error', message: '', transaction_id: null, error: text(error)});
+    }
+}
+
+check(false);
+if (!finished) {
+    observer = new MutationObserver(function () { check(false); });
+    observer.observe(document.documentElement,
+                     {childList: true, subtree: true, characterData: true, attributes: true});
+}
+"""
+
+
+class ConfirmationWatcher:
+    """Waits for the payment outcome using the confirmation, transaction and error selectors"""
+
+    def __init__(self, driver, elements, poll_interval=0.1):
+        self.driver = driver
+        self.elements = elements
+        self.poll_interval = poll_interval
+
+    def _locators(self, name):
+        if name not in self.elements.schema:
+            return []
+        return [list(locator) for locator in self.elements.locators(name)]
+
+    def mark_form_page(self):
+        """Remember the error marker the form shows now (call right before clicking Pay)"""
+        try:
+            self.driver.execute_script(MARK_FORM_PAGE_SCRIPT, self._locators('error_message'))
+        except WebDriverException:
+            pass
+
+    def wait(self):
+        """Return {'status', 'message', 'transaction_id', 'error'}.
+
+        status is 'success', 'error' (an error marker appeared or changed after
+        the Pay click) or 'timeout' (no outcome within the confirmation_message timeout).
+        """
+        specs = {
+            'success': self._locators('confirmation_message'),
+            'transaction_id': self._locators('transaction_id'),
+            'error': self._locators('error_message'),
+        }
+        budget = self.elements.schema['confirmation_message'].timeout
+        grace_ms = int(self.elements.schema['transaction_id'].timeout * 1000) if specs['transaction_id'] else 0
+        deadline = time.monotonic() + budget
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.driver.set_script_timeout(remaining + grace_ms / 1000)
+            try:
+                return self.driver.execute_async_script(WATCH_SCRIPT, specs, grace_ms)
+            except TimeoutException:
+                break
+            except WebDriverException:
+                # The Pay click navigated away while the observer was installed;
+                # watch again on the page that replaced it
+                time.sleep(self.poll_interval)
+
+        return {'status': 'timeout', 'message': '', 'transaction_id': None, 'error': None}
@@ -0,0 +1,224 @@
+"""Long-lived automation daemon that keeps one logged-in browser warm between top-ups.
+
+    python daemon.py serve     # owns the browser, listens on daemon.host:daemon.port
+    python daemon.py client    # card/amount dialogs, then sends the top-up to the daemon
+
+Requests are one JSON line per connection and are handled strictly one at a
+time. Between requests the page is reset to about:blank. The browser is
+restarted when it stops responding, when a payment hits a WebDriver error,
+after ``daemon.max_requests`` top-ups, and when its memory or CPU crosses a
+``browser_settings.monitor`` limit (see monitor.py). Clients authenticate with a
+random token that the daemon writes to ``daemon.token_file`` (mode 0600).
+A top-up request may carry an ``idempotency_key`` (see jobs.py).
+"""
+import argparse
+import json
+import os
+import secrets
+import socket
+import socketserver
+
+from cli import amount_argument
+from payment_automation import PaymentAutomation
+
+
+class AutomationDaemon:
+    """Owns the warm PaymentAutomation and runs top-ups on it"""
+
+    def __init__(self, config_path='config.json'):
+        self.app = PaymentAutomation(config_path, interactive=False)
+        if not self.app.config:
+            raise SystemExit(f"Could not load {config_path}")
+        self.settings = self.app.settings.daemon
+        self.served = 0
+
+    def start_browser(self):
+        """Launch the browser, open the top-up page and log in if needed"""
+        print("Starting browser...")
+        self.app.setup_driver()
+        self.app.driver.get(self.app.settings.url)
+        self.app.login_to_foodpanda()
+        self.served = 0
+        print("Browser ready.")
+
+    def stop_browser(self):
+        try:
+            self.app.quit_driver()
+        except Exception:
+            # Already dead or unreachable; quit_driver() has dropped it either way
+            pass
+
+    def restart_browser(self, reason):
+        print(f"Restarting browser ({reason})...")
+        self.stop_browser()
+        self.start_browser()
+
+    def reset_page(self):
+        """Close stray windows and blank the page so every top-up starts from a clean load"""
+        handles = self.app.driver.window_handles
+        for handle in handles[1:]:
+            self.app.driver.switch_to.window(handle)
+            self.app.driver.close()
+        self.app.driver.switch_to.window(handles[0])
+        self.app.driver.get('about:blank')
+
+    def top_up(self, card_name, amount, idempotency_key=None):
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return {'ok': False, 'error': f"Invalid amount '{amount}'"}
+
+        if not self.app.browser_alive():
+            self.restart_browser("browser not responding")
+
+        # Each top-up is its own run in the timings file
+        self.app.new_run()
+        result = self.app.top_up(card_name, amount, idempotency_key=idempotency_key)
+        if result['status'] in ('invalid', 'skipped'):
+            return {'ok': True, 'result': result}
+
+        # Never retry a failed payment here: it may already have been submitted
+        self.served += 1
+        try:
+            self.prepare_next()
+        except Exception as e:
+            # The payment's outcome stands; the next request starts a fresh browser
+            print(f"Could not get the browser ready for the next top-up: {e}")
+            self.stop_browser()
+        return {'ok': True, 'result': result}
+
+    def prepare_next(self):
+        """Restart the browser if it needs it, otherwise reset the page"""
+        if not self.app.browser_alive():
+            self.restart_browser("browser failed during the payment")
+        elif self.served >= self.settings['max_requests']:
+            self.restart_browser(f"served {self.served} requests")
+        else:
+            pressure = self.app.resource_pressure()
+            if pressure:
+                self.restart_browser(pressure)
+            else:
+                self.reset_page()
+
+    def handle(self, request):
+        if not secrets.compare_digest(str(request.get('token', '')), self.token):
+            return {'ok': False, 'error': "Invalid daemon token"}
+        command = request.get('command')
+        if command == 'ping':
+            return {'ok': True, 'served': self.served, 'browser_alive': self.app.browser_alive()}
+        if command == 'top_up':
+            return self.top_up(request.get('card'), request.get('amount'), request.get('idempotency_key'))
+        return {'ok': False, 'error': f"Unknown command '{command}'"}
+
+    def _write_token(self):
+        self.token = secrets.token_hex(16)
+        descriptor = os.open(self.settings['token_file'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(self.token)
+
+    def serve_forever(self):
+        self._write_token()
+        self.start_browser()
+        server = DaemonServer((self.settings['host'], self.settings['port']), self)
+        print(f"Payment daemon listening on {self.settings['host']}:{self.settings['port']} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stop_browser()
+            if os.path.exists(self.settings['token_file']):
+                os.remove(self.settings['token_file'])
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    # Seconds a client gets to send its request line (and read the reply), so a
+    # silent connection can't hold up the single-threaded server
+    timeout = 5
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            response = self.server.automation_daemon.handle(request)
+        except (json.JSONDecodeError, AttributeError) as e:
+            response = {'ok': False, 'error': f"Bad request: {e}"}
+        except Exception as e:
+            response = {'ok': False, 'error': f"Daemon error: {e}"}
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class DaemonServer(socketserver.TCPServer):
+    """Single-threaded on purpose: one top-up at a time on the one browser"""
+
+    allow_reuse_address = True
+
+    def __init__(self, address, automation_daemon):
+        self.automation_daemon = automation_daemon
+        super().__init__(address, DaemonRequestHandler)
+
+
+def send_request(settings, request):
+    """Send one request to a running daemon and return its response"""
+    with open(settings['token_file'], 'r') as file:
+        request = {**request, 'token': file.read().strip()}
+    with socket.create_connection((settings['host'], settings['port']), timeout=settings['client_timeout']) as sock:
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as reader:
+            return json.loads(reader.readline())
+
+
+def run_client(config_path, card_name=None, amount=None, idempotency_key=None):
+    """Thin replacement for main(): dialogs here, browser work in the daemon"""
+    app = PaymentAutomation(config_path)
+    if not app.config:
+        return
+    settings = app.settings.daemon
+
+    if card_name is None:
+        card = app.show_card_selection()
+        if not card:
+            print("No card selected. Exiting...")
+            return
+        card_name = card.name
+    if amount is None:
+        amount = app.get_payment_amount()
+        if not amount:
+            print("No amount entered. Exiting...")
+            return
+
+    print(f"Sending top-up of ₱{amount} with {card_name} to the daemon...")
+    try:
+        response = send_request(settings, {'command': 'top_up', 'card': card_name, 'amount': amount,
+                                           'idempotency_key': idempotency_key})
+    except OSError as e:
+        print(f"Could not reach the payment daemon: {e}")
+        print("Start it with: python daemon.py serve")
+        return
+
+    if response['ok']:
+        app.show_payment_result(response['result'])
+    else:
+        print(f"Daemon error: {response['error']}")
+        app.show_payment_result({'status': 'form_failed', 'error': response['error']})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payment automation daemon")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('serve', help="run the daemon with a warm browser")
+    client_parser = subparsers.add_parser('client', help="send a top-up to the running daemon")
+    client_parser.add_argument('--card', help="card name (skips the card dialog)")
+    client_parser.add_argument('--amount', type=amount_argument, help="amount (skips the amount dialog)")
+    client_parser.add_argument('--key', help="idempotency key: the daemon never pays twice under one key")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        AutomationDaemon(args.config).serve_forever()
+    else:
+        run_client(args.config, args.card, args.amount, args.key)
+
+
+if __name__ == "__main__":
+    main()
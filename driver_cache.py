@@ -0,0 +1,165 @@
+"""Local, versioned cache of WebDriver binaries.
+
+Drivers live under ``<cache_dir>/<driver>/<version>/<platform>/`` and are
+listed in ``<cache_dir>/manifest.json`` together with the browser version
+they were built for. Resolving a driver only reads the manifest, so browser
+start-up never touches the network; ``python setup_chromedriver.py``
+populates or refreshes the cache. The archives it downloads are kept in
+``<cache_dir>/archives/`` with their SHA-256, so a refresh that lands on
+the same version reuses the archive instead of downloading it again.
+"""
+import json
+import os
+import platform
+import re
+import shutil
+import stat
+import subprocess
+import sys
+from datetime import datetime
+
+
+DEFAULT_CACHE_DIR = 'drivers'
+MANIFEST_NAME = 'manifest.json'
+ARCHIVE_DIR = 'archives'
+
+# Commands that print the installed browser version, tried in order
+BROWSER_VERSION_COMMANDS = {
+    'chrome': {
+        'win': [['reg', 'query', r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon', '/v', 'version']],
+        'linux': [['google-chrome', '--version'], ['google-chrome-stable', '--version'],
+                  ['chromium', '--version'], ['chromium-browser', '--version']],
+        'mac': [['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome', '--version']],
+    },
+    'firefox': {
+        'win': [['reg', 'query', r'HKEY_LOCAL_MACHINE\SOFTWARE\Mozilla\Mozilla Firefox', '/v', 'CurrentVersion']],
+        'linux': [['firefox', '--version']],
+        'mac': [['/Applications/Firefox.app/Contents/MacOS/firefox', '--version']],
+    },
+}
+
+
+def current_platform():
+    """Platform name in Chrome for Testing terms: win32, win64, linux64, mac-x64 or mac-arm64"""
+    machine = platform.machine().lower()
+    if sys.platform.startswith('win'):
+        return 'win64' if machine.endswith('64') else 'win32'
+    if sys.platform == 'darwin':
+        return 'mac-arm64' if machine in ('arm64', 'aarch64') else 'mac-x64'
+    return 'linux64'
+
+
+def executable_name(driver):
+    return f"{driver}.exe" if sys.platform.startswith('win') else driver
+
+
+def _os_family():
+    if sys.platform.startswith('win'):
+        return 'win'
+    return 'mac' if sys.platform == 'darwin' else 'linux'
+
+
+def detect_browser_major(browser):
+    """Major version of the locally installed browser, or None if it can't be found"""
+    for command in BROWSER_VERSION_COMMANDS[browser][_os_family()]:
+        try:
+            output = subprocess.run(command, capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r'(\d+)\.\d+', output)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _version_key(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+class DriverCache:
+    """Reads and updates the driver manifest"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {'drivers': []}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def entries(self, driver, platform_name=None):
+        """Cached entries for ``driver`` on this platform, newest version first"""
+        platform_name = platform_name or current_platform()
+        entries = [entry for entry in self.load_manifest()['drivers']
+                   if entry['driver'] == driver and entry['platform'] == platform_name
+                   and os.path.exists(os.path.join(self.cache_dir, entry['path']))]
+        return sorted(entries, key=lambda entry: _version_key(entry['version']), reverse=True)
+
+    def resolve(self, driver, browser=None):
+        """Path to the best cached ``driver`` binary, or None when none is cached.
+
+        With several versions cached, the one built for the installed
+        browser's major version wins; otherwise the newest is used.
+        """
+        entries = self.entries(driver)
+        if not entries:
+            return None
+
+        if len(entries) > 1 and browser:
+            browser_major = detect_browser_major(browser)
+            for entry in entries:
+                if entry.get('browser_major') == browser_major:
+                    return os.path.abspath(os.path.join(self.cache_dir, entry['path']))
+
+        return os.path.abspath(os.path.join(self.cache_dir, entries[0]['path']))
+
+    def archive_path(self, archive_name):
+        """Where a downloaded driver archive is kept for reuse"""
+        return os.path.join(self.cache_dir, ARCHIVE_DIR, archive_name)
+
+    def archive_checksum(self, archive_name):
+        """SHA-256 recorded when ``archive_name`` was downloaded, or None"""
+        return self.load_manifest().get('archives', {}).get(archive_name, {}).get('sha256')
+
+    def record_archive(self, archive_name, sha256, url):
+        manifest = self.load_manifest()
+        manifest.setdefault('archives', {})[archive_name] = {
+            'sha256': sha256,
+            'url': url,
+            'downloaded_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._save_manifest(manifest)
+
+    def install(self, driver, version, binary_path, browser_major=None, platform_name=None):
+        """Copy a downloaded driver binary into the cache and record it in the manifest"""
+        platform_name = platform_name or current_platform()
+        relative_path = os.path.join(driver, version, platform_name, os.path.basename(binary_path))
+        target = os.path.join(self.cache_dir, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(binary_path, target)
+        os.chmod(target, os.stat(target).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        manifest = self.load_manifest()
+        manifest['drivers'] = [entry for entry in manifest['drivers']
+                               if not (entry['driver'] == driver and entry['version'] == version
+                                       and entry['platform'] == platform_name)]
+        manifest['drivers'].append({
+            'driver': driver,
+            'version': version,
+            'platform': platform_name,
+            'browser_major': browser_major,
+            'path': relative_path,
+            'installed_at': datetime.now().isoformat(timespec='seconds'),
+        })
+        self._save_manifest(manifest)
+        return os.path.abspath(target)
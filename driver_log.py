@@ -0,0 +1,77 @@
+"""Driver log location, level and rotation.
+
+Configured by ``browser_settings.driver_log`` in config.json::
+
+    "driver_log": {
+        "directory": "logs",
+        "level": "warning",
+        "max_bytes": 1048576,
+        "backups": 3
+    }
+
+geckodriver and chromedriver write their logs straight to the file, so the
+log is rotated when a driver is launched (``geckodriver.log`` ->
+``geckodriver.log.1`` ...) once it has grown past ``max_bytes``.
+"""
+import os
+
+
+DEFAULT_DRIVER_LOG = {
+    'directory': 'logs',
+    'level': 'warning',
+    'max_bytes': 1024 * 1024,
+    'backups': 3,
+}
+
+# Common level name -> the driver's own name for it
+DRIVER_LOG_LEVELS = {
+    'geckodriver': {'debug': 'debug', 'info': 'info', 'warning': 'warn', 'error': 'error', 'off': 'fatal'},
+    'chromedriver': {'debug': 'DEBUG', 'info': 'INFO', 'warning': 'WARNING', 'error': 'SEVERE', 'off': 'OFF'},
+}
+LOG_LEVELS = tuple(DRIVER_LOG_LEVELS['geckodriver'])
+
+
+def driver_log_settings(browser_settings):
+    """The effective driver_log settings; raises ValueError for a bad level or size"""
+    settings = {**DEFAULT_DRIVER_LOG, **browser_settings.get('driver_log', {})}
+    if settings['level'] not in LOG_LEVELS:
+        raise ValueError(f"Unknown driver log level '{settings['level']}' (expected {', '.join(LOG_LEVELS)})")
+    for key in ('max_bytes', 'backups'):
+        value = settings[key]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(f"{key} must be a non-negative integer, not {value!r}")
+    return settings
+
+
+def rotate(path, max_bytes, backups):
+    """Shift ``path`` to ``path.1`` (and so on, keeping ``backups`` files) once it exceeds ``max_bytes``"""
+    try:
+        if os.path.getsize(path) <= max_bytes:
+            return False
+    except OSError:
+        return False
+
+    for index in range(backups - 1, 0, -1):
+        older = f"{path}.{index}"
+        if os.path.exists(older):
+            os.replace(older, f"{path}.{index + 1}")
+    if backups > 0:
+        os.replace(path, f"{path}.1")
+    else:
+        os.remove(path)
+    return True
+
+
+def service_options(driver, settings):
+    """``log_path`` and ``service_args`` for the selenium Service of ``driver``, after rotating its log"""
+    os.makedirs(settings['directory'], exist_ok=True)
+    log_path = os.path.join(settings['directory'], f"{driver}.log")
+    rotate(log_path, settings['max_bytes'], settings['backups'])
+
+    level = DRIVER_LOG_LEVELS[driver][settings['level']]
+    if driver == 'geckodriver':
+        service_args = ['--log', level]
+    else:
+        # chromedriver truncates its log on start unless told to append
+        service_args = [f'--log-level={level}', '--append-log']
+    return {'log_path': log_path, 'service_args': service_args}
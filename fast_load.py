@@ -0,0 +1,104 @@
+"""Faster navigation: eager page loads and blocking of resources the form doesn't need.
+
+Configured by ``browser_settings.fast_load`` in config.json::
+
+    "fast_load": {
+        "enabled": true,
+        "page_load_strategy": "eager",
+        "block_resource_types": ["image", "font", "media"],
+        "block_hosts": ["*.google-analytics.com", "*.doubleclick.net"]
+    }
+
+Firefox blocks resource types through preferences and hosts through a
+generated proxy auto-config that sends them to a dead port (this replaces
+any system proxy for the automation profile). Chrome uses content-settings
+preferences plus DevTools ``Network.setBlockedURLs`` after launch.
+"""
+from urllib.parse import quote
+
+
+DEFAULT_FAST_LOAD = {
+    'enabled': False,
+    'page_load_strategy': 'eager',
+    'block_resource_types': ['image', 'font', 'media'],
+    'block_hosts': [],
+}
+
+PAGE_LOAD_STRATEGIES = ('normal', 'eager', 'none')
+
+# URL patterns per resource type, for Chrome's Network.setBlockedURLs
+RESOURCE_URL_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.avif'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.m4a', '*.m3u8'],
+    'stylesheet': ['*.css'],
+}
+
+FIREFOX_RESOURCE_PREFERENCES = {
+    'image': {'permissions.default.image': 2},
+    'font': {'browser.display.use_document_fonts': 0, 'gfx.downloadable_fonts.enabled': False},
+    'media': {'media.autoplay.default': 5, 'media.autoplay.blocking_policy': 2, 'media.preload.default': 0},
+    'stylesheet': {'permissions.default.stylesheet': 2},
+}
+
+# Unroutable proxy used to black-hole blocked hosts
+BLACKHOLE_PROXY = 'PROXY 127.0.0.1:9'
+
+
+def fast_load_settings(browser_settings):
+    """The effective fast_load settings, or None when the mode is off"""
+    settings = {**DEFAULT_FAST_LOAD, **browser_settings.get('fast_load', {})}
+    if not settings['enabled']:
+        return None
+    if settings['page_load_strategy'] not in PAGE_LOAD_STRATEGIES:
+        raise ValueError(f"Unknown page_load_strategy {settings['page_load_strategy']!r} "
+                         f"(expected {', '.join(PAGE_LOAD_STRATEGIES)})")
+    for key in ('block_resource_types', 'block_hosts'):
+        if not isinstance(settings[key], list) or not all(isinstance(item, str) for item in settings[key]):
+            raise ValueError(f"{key} must be a list of strings, not {settings[key]!r}")
+    unknown = set(settings['block_resource_types']) - set(RESOURCE_URL_PATTERNS)
+    if unknown:
+        raise ValueError(f"Unknown fast_load resource types: {', '.join(sorted(unknown))} "
+                         f"(expected {', '.join(RESOURCE_URL_PATTERNS)})")
+    return settings
+
+
+def _pac_script(hosts):
+    conditions = ' || '.join(f'shExpMatch(host, "{host}")' for host in hosts)
+    return (f'function FindProxyForURL(url, host) {{ '
+            f'return ({conditions}) ? "{BLACKHOLE_PROXY}" : "DIRECT"; }}')
+
+
+def firefox_preferences(settings):
+    """Preferences that make Firefox skip the blocked resource types and hosts"""
+    preferences = {}
+    for resource_type in settings['block_resource_types']:
+        preferences.update(FIREFOX_RESOURCE_PREFERENCES[resource_type])
+    if settings['block_hosts']:
+        preferences['network.proxy.type'] = 2
+        preferences['network.proxy.autoconfig_url'] = 'data:application/x-ns-proxy-autoconfig,' + quote(
+            _pac_script(settings['block_hosts']))
+    return preferences
+
+
+def chrome_preferences(settings):
+    if 'image' in settings['block_resource_types']:
+        return {'profile.managed_default_content_settings.images': 2}
+    return {}
+
+
+def blocked_url_patterns(settings):
+    """URL patterns for Chrome's Network.setBlockedURLs"""
+    patterns = []
+    for resource_type in settings['block_resource_types']:
+        patterns.extend(RESOURCE_URL_PATTERNS[resource_type])
+    patterns.extend(f"*://{host}/*" for host in settings['block_hosts'])
+    return patterns
+
+
+def apply_chrome_blocking(driver, settings):
+    """Install the DevTools URL blocklist on a freshly launched Chrome"""
+    patterns = blocked_url_patterns(settings)
+    if patterns:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
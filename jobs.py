@@ -0,0 +1,122 @@
+"""Job files: several top-ups run one after another over a single browser session.
+
+A job file is a JSON list::
+
+    [
+        {"card": "Personal Visa", "amount": 500},
+        {"card": "Work Mastercard", "amount": 250, "key": "invoice-1042"}
+    ]
+
+Each job has an idempotency key: its own ``key``, or one derived from the
+batch (the file's absolute path and a hash of its content) plus the job's
+position, card and amount. A new or edited file is therefore a new batch;
+give jobs explicit keys if a file may be edited between reruns. Keys are claimed in the journal before
+the form is submitted, so running the same file again after a crash or a
+partial failure skips every payment that went through, retries the declined
+ones and leaves interrupted ones for a manual check (``python ledger.py jobs``).
+
+    python cli.py batch topups.json
+"""
+import hashlib
+import json
+import math
+import os
+import re
+
+
+def batch_id(job_file, content):
+    """Identifies one batch: the same file with the same content, wherever it is run from"""
+    digest = hashlib.sha256(os.path.abspath(job_file).encode('utf-8') + b'\0' + content).hexdigest()
+    return f"{os.path.basename(job_file)}@{digest[:12]}"
+
+
+def default_key(batch, index, card_name, amount):
+    """Idempotency key for a job without its own ``key``: stable across reruns of the same batch"""
+    card_slug = re.sub(r'[^a-z0-9]+', '-', card_name.lower()).strip('-')
+    return f"{batch}#{index}-{card_slug}-{amount:g}"
+
+
+def load_jobs(job_file):
+    """Read and check a job file; returns a list of {'card', 'amount', 'key'} dicts"""
+    with open(job_file, 'rb') as file:
+        content = file.read()
+    entries = json.loads(content)
+    batch = batch_id(job_file, content)
+    if not isinstance(entries, list):
+        raise ValueError(f"{job_file} must contain a JSON list of jobs")
+
+    jobs = []
+    for index, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or 'card' not in entry or 'amount' not in entry:
+            raise ValueError(f"Job {index} in {job_file} needs a 'card' and an 'amount'")
+        if not isinstance(entry['card'], str) or not entry['card'].strip():
+            raise ValueError(f"Job {index} in {job_file} has an invalid card: {entry['card']!r}")
+        amount = entry['amount']
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount) or amount <= 0:
+            raise ValueError(f"Job {index} in {job_file} has an invalid amount: {amount!r}")
+        key = entry.get('key') or default_key(batch, index, entry['card'], amount)
+        jobs.append({'card': entry['card'], 'amount': float(amount), 'key': str(key)})
+
+    keys = [job['key'] for job in jobs]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job keys in {job_file}: {', '.join(duplicates)}")
+    return jobs
+
+
+def not_run(job, reason):
+    """Result for a job that was never started (nothing claimed, so a rerun picks it up)"""
+    return {'status': 'not_run', 'message': '', 'transaction_id': "N/A", 'error': reason,
+            'card': job['card'], 'amount': job['amount'], 'key': job['key']}
+
+
+def run_jobs(app, jobs):
+    """Run ``jobs`` in order on one browser; returns the top_up() result of each.
+
+    If the browser can't be (re)started, the jobs left are returned as 'not_run'.
+    """
+    results = []
+    print("Setting up browser...")
+    try:
+        app.setup_driver()
+    except Exception as e:
+        print(f"Could not start the browser: {e}")
+        return [not_run(job, f"Browser could not start: {e}") for job in jobs]
+    try:
+        for index, job in enumerate(jobs, start=1):
+            print(f"\nJob {index}/{len(jobs)}: ₱{job['amount']} with {job['card']} ({job['key']})")
+            # Each job is its own run in the timings file
+            app.new_run()
+            result = app.top_up(job['card'], job['amount'], idempotency_key=job['key'])
+            result['key'] = job['key']
+            results.append(result)
+
+            # A failed payment is never retried here, but the next job gets a working browser
+            if index < len(jobs):
+                reason = "it stopped responding" if not app.browser_alive() else app.resource_pressure()
+                if reason:
+                    print(f"Restarting the browser for the next job ({reason})...")
+                    try:
+                        app.quit_driver()
+                    except Exception:
+                        pass
+                    try:
+                        app.setup_driver()
+                    except Exception as e:
+                        print(f"Could not restart the browser - stopping the batch: {e}")
+                        results.extend(not_run(job, f"Browser could not restart: {e}") for job in jobs[index:])
+                        break
+    finally:
+        if app.driver:
+            print("Closing browser...")
+            app.quit_driver()
+    return results
+
+
+def print_results(results):
+    print(f"\n{'key':<40}{'status':<13}{'amount':>10}  transaction ID / error")
+    for result in results:
+        detail = result['transaction_id'] if result['status'] == 'success' else (result['error'] or '')
+        print(f"{result['key']:<40}{result['status']:<13}{result['amount']:>10,.2f}  {detail}")
+    paid = sum(result['status'] == 'success' for result in results)
+    print(f"{paid}/{len(results)} paid in this run")
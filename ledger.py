@@ -0,0 +1,430 @@
+"""Transaction journal: the primary record of every top-up.
+
+Each transaction is one committed INSERT into a SQLite database (WAL mode,
+synchronous=FULL), so recording costs the same however long the history
+is and a crash can't corrupt earlier rows. transactions.xlsx is produced
+from the journal with ``python ledger.py export``.
+
+The same write also bumps running totals per card, per day and per month
+in ``spend_totals``, and the transaction ID, date and card columns are
+indexed, so ``python ledger.py report`` and ``find`` answer from a handful
+of index lookups instead of scanning the history.
+
+Top-ups run with an idempotency key (see jobs.py) also get a row in
+``jobs``, so a retried or resumed batch never repeats a completed payment.
+``python ledger.py jobs`` lists them; ``resolve`` settles one after a
+manual check. Resolving an unconfirmed job as failed voids its transaction:
+the row stays, marked ``voided_at``, but drops out of the totals, reports
+and exports.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+
+DEFAULT_JOURNAL_FILE = 'transactions.db'
+EXCEL_HEADERS = ['Date', 'Time', 'Card Used', 'Amount', 'Transaction ID', 'Confirmation Message']
+
+# period_type -> SQL expression for the period key of a transactions row
+PERIODS = {
+    'card': "''",
+    'day': "date",
+    'month': "substr(date, 1, 7)",
+}
+
+
+
+def _rebuild_totals_statements(where=''):
+    return ["DELETE FROM spend_totals"] + [
+        "INSERT INTO spend_totals (period_type, period, card_name, transactions, total) "
+        f"SELECT '{period_type}', {period_sql}, card_name, COUNT(*), SUM(amount) FROM transactions {where} "
+        f"GROUP BY {period_sql}, card_name"
+        for period_type, period_sql in PERIODS.items()
+    ]
+
+
+# Migration 2 runs before transactions.voided_at exists; later rebuilds skip voided rows
+REBUILD_TOTALS = _rebuild_totals_statements("WHERE voided_at IS NULL")
+
+# Each entry upgrades the database by one PRAGMA user_version step
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        card_name TEXT NOT NULL,
+        amount REAL NOT NULL,
+        transaction_id TEXT,
+        confirmation_message TEXT
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_transactions_transaction_id ON transactions (transaction_id);
+    CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date);
+    CREATE INDEX IF NOT EXISTS idx_transactions_card_date ON transactions (card_name, date);
+    CREATE TABLE IF NOT EXISTS spend_totals (
+        period_type TEXT NOT NULL,
+        period TEXT NOT NULL,
+        card_name TEXT NOT NULL,
+        transactions INTEGER NOT NULL,
+        total REAL NOT NULL,
+        PRIMARY KEY (period_type, period, card_name)
+    ) WITHOUT ROWID;
+    """ + ";\n".join(_rebuild_totals_statements()) + ";",
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        idempotency_key TEXT PRIMARY KEY,
+        card_name TEXT NOT NULL,
+        amount REAL NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        transaction_row INTEGER REFERENCES transactions (id),
+        updated_at TEXT NOT NULL,
+        error TEXT
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+    """,
+    """
+    ALTER TABLE transactions ADD COLUMN voided_at TEXT;
+    """,
+]
+
+# Job statuses: 'pending' is written before the form is submitted and only
+# replaced once the outcome is known, so a pending job after a crash may or
+# may not have been paid. Only new and 'failed' (never charged) jobs may run.
+JOB_STATUSES = ('pending', 'done', 'unconfirmed', 'failed')
+RUNNABLE_JOB_STATUSES = (None, 'failed')
+
+UPSERT_TOTAL = """
+INSERT INTO spend_totals (period_type, period, card_name, transactions, total)
+VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (period_type, period, card_name)
+DO UPDATE SET transactions = transactions + 1, total = total + excluded.total
+"""
+
+
+class TransactionJournal:
+    """Append-only transaction store backed by SQLite"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self._migrate()
+
+    def _migrate(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        for target, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            self.connection.executescript(f"BEGIN; {script} PRAGMA user_version = {target}; COMMIT;")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, date, time, card_name, amount, transaction_id, confirmation_message,
+               idempotency_key=None, job_status='done'):
+        """Durably append one transaction and return its row id.
+
+        With ``idempotency_key`` the job is marked ``job_status`` in the same commit.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO transactions (date, time, card_name, amount, transaction_id, confirmation_message) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (date, time, card_name, amount, transaction_id, confirmation_message))
+            # Running totals are updated in the same commit as the row
+            self.connection.executemany(UPSERT_TOTAL, [
+                ('card', '', card_name, amount),
+                ('day', date, card_name, amount),
+                ('month', date[:7], card_name, amount),
+            ])
+            if idempotency_key:
+                self.connection.execute(
+                    "UPDATE jobs SET status = ?, transaction_row = ?, updated_at = ?, error = NULL "
+                    "WHERE idempotency_key = ?",
+                    (job_status, cursor.lastrowid, _now(), idempotency_key))
+        return cursor.lastrowid
+
+    def claim_job(self, idempotency_key, card_name, amount):
+        """Mark a job pending before it runs, unless an earlier attempt rules that out.
+
+        Returns the job's previous status (None for a new key). The job was
+        claimed only if that status is in RUNNABLE_JOB_STATUSES.
+        """
+        with self.connection:
+            # Take the write lock first, so two processes can't both claim the key
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute(
+                "SELECT status FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            previous = row[0] if row else None
+            if previous is None:
+                self.connection.execute(
+                    "INSERT INTO jobs (idempotency_key, card_name, amount, status, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', ?)",
+                    (idempotency_key, card_name, amount, _now()))
+            elif previous in RUNNABLE_JOB_STATUSES:
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'pending', attempts = attempts + 1, card_name = ?, amount = ?, "
+                    "updated_at = ?, error = NULL WHERE idempotency_key = ?",
+                    (card_name, amount, _now(), idempotency_key))
+        return previous
+
+    def finish_job(self, idempotency_key, status, error=None):
+        """Set a job's outcome when no transaction was recorded for it (or after a manual check)"""
+        if status not in JOB_STATUSES:
+            raise ValueError(f"Unknown job status '{status}' (expected {', '.join(JOB_STATUSES)})")
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, error = ? WHERE idempotency_key = ?",
+                (status, _now(), error, idempotency_key))
+        return cursor.rowcount
+
+    def resolve_job(self, idempotency_key, status):
+        """Settle a job after a manual check; returns False for an unknown key.
+
+        Resolving as 'failed' also voids the job's recorded transaction (an
+        unconfirmed one, usually) and takes it out of the running totals.
+        """
+        if status not in ('done', 'failed'):
+            raise ValueError(f"A job can only be resolved as done or failed, not '{status}'")
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, error = ? WHERE idempotency_key = ?",
+                (status, _now(), "resolved manually", idempotency_key))
+            if not cursor.rowcount:
+                return False
+            if status == 'failed':
+                row = self.connection.execute(
+                    "SELECT t.id, t.date, t.card_name, t.amount FROM jobs j JOIN transactions t "
+                    "ON t.id = j.transaction_row WHERE j.idempotency_key = ? AND t.voided_at IS NULL",
+                    (idempotency_key,)).fetchone()
+                if row:
+                    self._void(*row)
+        return True
+
+    def _void(self, row_id, date, card_name, amount):
+        """Mark one transaction voided and subtract it from spend_totals (inside the caller's commit)"""
+        self.connection.execute("UPDATE transactions SET voided_at = ? WHERE id = ?", (_now(), row_id))
+        self.connection.executemany(
+            "UPDATE spend_totals SET transactions = transactions - 1, total = total - ? "
+            "WHERE period_type = ? AND period = ? AND card_name = ?",
+            [(amount, 'card', '', card_name), (amount, 'day', date, card_name),
+             (amount, 'month', date[:7], card_name)])
+        self.connection.execute("DELETE FROM spend_totals WHERE transactions <= 0")
+
+    def jobs(self, status=None):
+        """(key, card, amount, status, attempts, updated_at, error) rows, oldest change first"""
+        query = "SELECT idempotency_key, card_name, amount, status, attempts, updated_at, error FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        return self.connection.execute(query + " ORDER BY updated_at", params).fetchall()
+
+    def _rebuild_totals(self):
+        """Recompute spend_totals from scratch (used after bulk imports and migrations)"""
+        for statement in REBUILD_TOTALS:
+            self.connection.execute(statement)
+
+    def find_transaction(self, transaction_id):
+        """All journal rows recorded with ``transaction_id``, voided ones included (uses the transaction ID index)"""
+        cursor = self.connection.execute(
+            "SELECT date, time, card_name, amount, transaction_id, confirmation_message, voided_at "
+            "FROM transactions WHERE transaction_id = ? ORDER BY id",
+            (transaction_id,))
+        return cursor.fetchall()
+
+    def spend_totals(self, by='card', card_name=None, period=None):
+        """(period, card, transactions, total) rows from the running aggregates.
+
+        ``by`` is 'card', 'day' or 'month'; ``period`` filters by prefix, so
+        '2025-03' selects that month, or every day in it when by='day'.
+        """
+        if by not in PERIODS:
+            raise ValueError(f"Unknown report period '{by}' (expected {', '.join(PERIODS)})")
+        query = "SELECT period, card_name, transactions, total FROM spend_totals WHERE period_type = ?"
+        params = [by]
+        if card_name:
+            query += " AND card_name = ?"
+            params.append(card_name)
+        if period:
+            query += " AND period >= ? AND period < ?"
+            params.extend([period, period + '\uffff'])
+        return self.connection.execute(query + " ORDER BY period, card_name", params).fetchall()
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM transactions WHERE voided_at IS NULL").fetchone()[0]
+
+    def rows(self):
+        """Iterate over all transactions that weren't voided, in the order they were recorded, in Excel column order"""
+        return self.connection.execute(
+            "SELECT date, time, card_name, amount, transaction_id, confirmation_message "
+            "FROM transactions WHERE voided_at IS NULL ORDER BY id")
+
+    def import_excel(self, excel_file):
+        """Copy rows from an existing transactions.xlsx into the journal; returns the number imported"""
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(excel_file, read_only=True)
+        try:
+            rows = []
+            for number, row in enumerate(workbook.active.iter_rows(min_row=2, values_only=True), start=2):
+                if row and row[0] is not None:
+                    try:
+                        rows.append(_excel_row(row))
+                    except (TypeError, ValueError) as e:
+                        raise ValueError(f"{excel_file} row {number}: {e}")
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO transactions (date, time, card_name, amount, transaction_id, confirmation_message) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._rebuild_totals()
+            return len(rows)
+        finally:
+            workbook.close()
+
+    def export_excel(self, excel_file):
+        """Stream the journal into ``excel_file`` without holding it in memory; returns the row count"""
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        worksheet.append(EXCEL_HEADERS)
+        exported = 0
+        for row in self.rows():
+            worksheet.append(row)
+            exported += 1
+
+        # Write next to the target and swap in, so a failed export keeps the old file
+        temp_file = excel_file + '.tmp'
+        workbook.save(temp_file)
+        os.replace(temp_file, excel_file)
+        return exported
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _excel_row(row):
+    """Normalise a legacy workbook row (Excel may hand back dates as datetime objects)"""
+    date, time_value, card_name, amount, transaction_id, message = (tuple(row) + (None,) * 6)[:6]
+    if hasattr(date, 'strftime'):
+        date = date.strftime("%Y-%m-%d")
+    if hasattr(time_value, 'strftime'):
+        time_value = time_value.strftime("%H:%M:%S")
+    return str(date), str(time_value), card_name, float(amount or 0), transaction_id, message
+
+
+def open_journal(journal_file, excel_file=None):
+    """Open the journal, seeding a brand-new one from a legacy transactions.xlsx.
+
+    If that import fails the new journal is deleted again, so the next open
+    retries it instead of carrying on without the old history.
+    """
+    is_new = not os.path.exists(journal_file)
+    journal = TransactionJournal(journal_file)
+    if is_new and excel_file and os.path.exists(excel_file):
+        try:
+            imported = journal.import_excel(excel_file)
+        except Exception:
+            journal.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(journal_file + suffix):
+                    os.remove(journal_file + suffix)
+            raise
+        print(f"Imported {imported} existing transactions from {excel_file} into {journal_file}")
+    return journal
+
+
+def export_ledger(settings, output=None):
+    """Write the journal named in ``settings`` to ``output`` (default: excel_file); returns the row count"""
+    output = output or settings.excel_file
+    with open_journal(settings.journal_file, settings.excel_file) as journal:
+        return journal.export_excel(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction journal tools")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help="write the journal out as an Excel workbook")
+    export_parser.add_argument('--output', help="workbook to write (default: excel_file from config)")
+    report_parser = subparsers.add_parser('report', help="spend totals per card, day or month")
+    report_parser.add_argument('--by', choices=sorted(PERIODS), default='card', help="grouping (default: card)")
+    report_parser.add_argument('--card', help="only this card name")
+    report_parser.add_argument('--period', help="date prefix, e.g. 2025-03 or 2025-03-14")
+    find_parser = subparsers.add_parser('find', help="look up a transaction ID")
+    find_parser.add_argument('transaction_id')
+    jobs_parser = subparsers.add_parser('jobs', help="list idempotency-keyed jobs")
+    jobs_parser.add_argument('--status', choices=JOB_STATUSES, help="only jobs with this status")
+    resolve_parser = subparsers.add_parser('resolve', help="set a job's status after checking it manually")
+    resolve_parser.add_argument('idempotency_key')
+    resolve_parser.add_argument('status', choices=['done', 'failed'],
+                                help="done: it was paid (never run again); failed: it wasn't (may be retried, "
+                                     "and its unconfirmed transaction is voided)")
+    args = parser.parse_args()
+
+    # settings.py imports this module for DEFAULT_JOURNAL_FILE
+    from settings import ConfigError, load_settings
+
+    try:
+        settings = load_settings(args.config)
+    except (OSError, ConfigError) as e:
+        raise SystemExit(f"❌ {e}")
+
+    if args.command == 'export':
+        exported = export_ledger(settings, args.output)
+        print(f"Exported {exported} transactions to {args.output or settings.excel_file}")
+        return
+
+    if args.command in ('jobs', 'resolve'):
+        with open_journal(settings.journal_file, settings.excel_file) as journal:
+            if args.command == 'resolve':
+                if journal.resolve_job(args.idempotency_key, args.status):
+                    print(f"Job {args.idempotency_key} marked {args.status}")
+                else:
+                    print(f"No job with idempotency key {args.idempotency_key}")
+                return
+            rows = journal.jobs(args.status)
+        for key, card_name, amount, status, attempts, updated_at, error in rows:
+            print(f"{key}: {status} ({attempts} attempt{'s' if attempts != 1 else ''}, {updated_at}) "
+                  f"{card_name}, ₱{amount:,.2f}" + (f" - {error}" if error else ""))
+        if not rows:
+            print("No matching jobs.")
+        return
+
+    with open_journal(settings.journal_file, settings.excel_file) as journal:
+        started = time.perf_counter()
+        if args.command == 'report':
+            rows = journal.spend_totals(args.by, args.card, args.period)
+        else:
+            rows = journal.find_transaction(args.transaction_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.command == 'report':
+        for period, card_name, count, total in rows:
+            label = f"{period}  " if period else ""
+            print(f"{label}{card_name}: {count} top-ups, ₱{total:,.2f}")
+        if not rows:
+            print("No matching transactions.")
+    elif rows:
+        for date, time_str, card_name, amount, transaction_id, message, voided_at in rows:
+            print(f"{transaction_id}: {date} {time_str}, {card_name}, ₱{amount:,.2f} - {message}"
+                  + (f" (voided {voided_at})" if voided_at else ""))
+    else:
+        print(f"Transaction ID {args.transaction_id} was not recorded.")
+    print(f"({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Selector schema and element lookup for the configured website.
+
+Each entry in ``website.selectors`` may be a plain CSS string (a required
+element with the default timeout) or an object such as::
+
+    "pay_button": {
+        "locators": [{"xpath": "//button[contains(text(), 'Pay')]"},
+                     {"css": "button[type='submit']"}],
+        "required": true,
+        "timeout": 10
+    }
+
+A single locator can be written inline (``{"css": "...", "required": false}``).
+Optional elements use a short timeout and resolve to None when missing, so
+they never stall a run the way a global implicit wait does. Fields marked
+``"key_events": true`` are always typed with send_keys, even in the batched
+fill mode, for inputs whose handlers only react to real key presses.
+"""
+import re
+
+from selenium.common.exceptions import TimeoutException
+
+from waits import first_clickable, first_present
+
+
+# Values of selenium's By constants, spelled out so parsing the schema doesn't
+# import selenium.webdriver (config validation runs without a browser)
+LOCATOR_STRATEGIES = {
+    'css': 'css selector',
+    'xpath': 'xpath',
+    'id': 'id',
+    'name': 'name',
+    'link_text': 'link text',
+}
+DEFAULT_REQUIRED_TIMEOUT = 10
+DEFAULT_OPTIONAL_TIMEOUT = 2
+
+# jQuery/Sizzle pseudo-classes that look like CSS but make querySelector throw
+JQUERY_PSEUDO_CLASS = re.compile(
+    r':(contains|eq|gt|lt|first|last|even|odd|visible|hidden|header|animated|parent|input|button|'
+    r'checkbox|radio|text|password|submit|reset|image|file|selected)(?![\w-])')
+QUOTED_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+BRACKET_PAIRS = {')': '(', ']': '['}
+
+
+class SelectorSpec:
+    """One named element: its fallback chain of locators, whether it must exist and how long to look"""
+
+    def __init__(self, name, locators, required=True, timeout=None, key_events=False):
+        self.name = name
+        self.locators = locators
+        self.required = required
+        self.key_events = key_events
+        if timeout is None:
+            timeout = DEFAULT_REQUIRED_TIMEOUT if required else DEFAULT_OPTIONAL_TIMEOUT
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, name, entry):
+        if isinstance(entry, str):
+            return cls(name, [_parse_locator(name, {'css': entry})])
+        if not isinstance(entry, dict):
+            raise ValueError(f"Selector '{name}' must be a CSS string or an object, not {entry!r}")
+
+        raw_locators = entry.get('locators', [entry])
+        locators = [_parse_locator(name, raw) for raw in raw_locators]
+        if not locators:
+            raise ValueError(f"Selector '{name}' has no locators")
+        return cls(name, locators, entry.get('required', True), entry.get('timeout'),
+                   entry.get('key_events', False))
+
+    def __repr__(self):
+        kind = 'required' if self.required else 'optional'
+        return f"SelectorSpec({self.name!r}, {kind}, timeout={self.timeout}, {self.locators!r})"
+
+
+def _parse_locator(name, raw):
+    """Turn ``{"css": "..."}`` (or any other strategy key) into a (By, value) pair"""
+    matches = [(key, value) for key, value in raw.items() if key in LOCATOR_STRATEGIES]
+    if len(matches) != 1:
+        raise ValueError(f"Selector '{name}' needs exactly one of {sorted(LOCATOR_STRATEGIES)}: {raw}")
+    key, value = matches[0]
+    problem = locator_problem(key, value)
+    if problem:
+        raise ValueError(f"Selector '{name}' {key} {value!r}: {problem}")
+    return LOCATOR_STRATEGIES[key], value
+
+
+def locator_problem(strategy, value):
+    """Why the browser can't run this locator, or None when it looks fine.
+
+    Catches what would otherwise surface as a timeout mid-payment: empty values,
+    unbalanced quotes or brackets, and jQuery-only CSS such as ``:contains()``.
+    """
+    if not isinstance(value, str) or not value.strip():
+        return "must be a non-empty string"
+    if strategy not in ('css', 'xpath'):
+        return None
+
+    unquoted = QUOTED_STRING.sub("''", value)
+    if "'" in unquoted.replace("''", '') or '"' in unquoted:
+        return "has an unterminated quote"
+    stack = []
+    for char in unquoted:
+        if char in '([':
+            stack.append(char)
+        elif char in BRACKET_PAIRS:
+            if not stack or stack.pop() != BRACKET_PAIRS[char]:
+                return f"has an unmatched '{char}'"
+    if stack:
+        return f"has an unclosed '{stack[-1]}'"
+
+    if strategy == 'css':
+        pseudo = JQUERY_PSEUDO_CLASS.search(unquoted)
+        if pseudo:
+            hint = " (match text with an xpath locator: contains(text(), ...))" if pseudo.group(1) == 'contains' else ""
+            return f"uses the jQuery-only pseudo-class '{pseudo.group(0)}', which browsers reject{hint}"
+    return None
+
+
+def load_selector_schema(selectors_config):
+    """Parse the ``website.selectors`` block into SelectorSpecs keyed by name"""
+    return {name: SelectorSpec.from_config(name, entry) for name, entry in selectors_config.items()}
+
+
+class ElementFinder:
+    """Looks up named elements using each selector's own timeout and fallback chain"""
+
+    def __init__(self, waiter, schema):
+        self.waiter = waiter
+        self.schema = schema
+
+    def find(self, name, clickable=False):
+        """Return the first matching element, or None for a missing optional element.
+
+        Raises TimeoutException when a required element does not appear in time.
+        """
+        spec = self.schema[name]
+        condition = first_clickable(*spec.locators) if clickable else first_present(*spec.locators)
+        try:
+            return self.waiter.within(condition, spec.timeout)
+        except TimeoutException:
+            if spec.required:
+                raise TimeoutException(f"Required element '{name}' not found within {spec.timeout}s")
+            return None
+
+    def first_of(self, names, timeout):
+        """Wait up to ``timeout`` for any of the named elements; returns the first name found, or None"""
+        def condition(driver):
+            for name in names:
+                if first_present(*self.schema[name].locators)(driver):
+                    return name
+            return False
+
+        try:
+            return self.waiter.within(condition, timeout)
+        except TimeoutException:
+            return None
+
+    def is_present(self, name):
+        """Check once, without waiting, whether the named element is on the page"""
+        return bool(first_present(*self.schema[name].locators)(self.waiter.driver))
+
+    def locators(self, name):
+        return self.schema[name].locators
@@ -0,0 +1,243 @@
+"""Local stand-in for the FoodPanda PandaPay top-up page.
+
+Serves a form whose markup matches the selectors in config.json, with
+configurable render and response delays, optionally missing elements and
+a declining mode, so the automation can be exercised and timed without
+touching the live service::
+
+    python mock_site.py --port 8765 --render-delay 0.5 --response-delay 1 --omit transaction_id
+
+With ``--in-place`` the form is submitted with fetch() and the outcome is
+rendered on the form page itself, like a single-page checkout: a decline
+reveals an error placeholder that is on the page (hidden) from the start.
+"""
+import argparse
+import html
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+TOP_UP_PATH = '/pandapay/top-up/new/payment'
+
+# Elements that can be left out with --omit, keyed by their config.json selector name
+FORM_ELEMENTS = {
+    'amount_input': '<input name="amount" placeholder="Enter amount" inputmode="decimal">',
+    'credit_card_option': '<label><input type="radio" name="method" value="credit_card"> Credit/Debit Card</label>',
+    'card_number': '<input name="card_number" placeholder="Card number" autocomplete="cc-number">',
+    'expiry_date': '<input name="expiry" placeholder="MM/YY" autocomplete="cc-exp">',
+    'cvc': '<input name="cvc" placeholder="CVC" autocomplete="cc-csc">',
+    'cardholder_name': '<input name="holder" placeholder="Name of the card holder" autocomplete="cc-name">',
+    'submit_button': '<button type="submit">Pay</button>',
+}
+
+FORM_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>PandaPay top-up (mock)</title></head>
+<body>
+<div id="app">Loading...</div>
+<script>
+var parts = __PARTS__, inPlace = __IN_PLACE__, renderDelay = __RENDER_DELAY_MS__;
+setTimeout(function () {
+    var app = document.getElementById('app');
+    app.innerHTML =
+        (inPlace ? '<div class="error-message" style="display:none">Payment could not be processed.</div>' +
+                   '<div id="result"></div>' : '') +
+        '<form method="post" action="/confirm">' +
+        (parts.amount_input || '') +
+        '<div id="fee"></div>' +
+        (parts.credit_card_option || '') +
+        '<div id="card-fields"' + (parts.credit_card_option ? ' style="display:none"' : '') + '>' +
+        (parts.card_number || '') + (parts.expiry_date || '') + (parts.cvc || '') + (parts.cardholder_name || '') +
+        '</div>' +
+        (parts.submit_button || '') +
+        '</form>';
+
+    var radio = app.querySelector("input[type='radio'][value='credit_card']");
+    if (radio) {
+        radio.addEventListener('change', function () {
+            document.getElementById('card-fields').style.display = '';
+        });
+    }
+    var amount = app.querySelector("input[placeholder='Enter amount']");
+    if (amount) {
+        amount.addEventListener('change', function () {
+            fetch('/fee?amount=' + encodeURIComponent(amount.value))
+                .then(function (response) { return response.json(); })
+                .then(function (data) { document.getElementById('fee').textContent = 'Fee: ' + data.fee; });
+        });
+    }
+    var form = app.querySelector('form');
+    if (inPlace) {
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            fetch('/confirm?in_place=1', {method: 'POST', body: new URLSearchParams(new FormData(form))})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    setTimeout(function () {
+                        if (data.error) {
+                            var error = app.querySelector('.error-message');
+                            error.textContent = data.error;
+                            error.style.display = '';
+                        } else {
+                            document.getElementById('result').innerHTML = data.result;
+                        }
+                    }, renderDelay);
+                });
+        });
+    }
+}, renderDelay);
+</script>
+</body>
+</html>
+"""
+
+DECLINE_MESSAGE = 'Payment declined by the card issuer.'
+
+CONFIRMATION_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>PandaPay top-up result (mock)</title></head>
+<body>
+<div id="result">Processing...</div>
+<script>
+setTimeout(function () {
+    document.getElementById('result').innerHTML = __RESULT__;
+}, __RENDER_DELAY_MS__);
+</script>
+</body>
+</html>
+"""
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the MockTopUpServer that owns it"""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, body, content_type='text/html; charset=utf-8', status=200):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _render_delay_ms(self):
+        return int(self.server.render_delay * 1000)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/fee':
+            time.sleep(self.server.response_delay)
+            amount = parse_qs(url.query).get('amount', ['0'])[0]
+            try:
+                fee = round(float(amount) * 0.02, 2)
+            except ValueError:
+                fee = 0
+            self._send(json.dumps({'fee': fee}), 'application/json')
+        elif url.path in (TOP_UP_PATH, '/'):
+            parts = {name: markup for name, markup in FORM_ELEMENTS.items() if name not in self.server.omit}
+            page = (FORM_PAGE.replace('__PARTS__', json.dumps(parts))
+                    .replace('__IN_PLACE__', json.dumps(self.server.in_place))
+                    .replace('__RENDER_DELAY_MS__', str(self._render_delay_ms())))
+            self._send(page)
+        else:
+            self._send('Not found', 'text/plain', 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/confirm':
+            self._send('Not found', 'text/plain', 404)
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        time.sleep(self.server.response_delay)
+
+        amount = html.escape(form.get('amount', ['0'])[0])
+        if self.server.decline:
+            if 'in_place' in parse_qs(url.query):
+                self._send(json.dumps({'error': DECLINE_MESSAGE}), 'application/json')
+                return
+            result = f'<div class="error-message">{DECLINE_MESSAGE}</div>'
+        else:
+            reference = f"TXN-{uuid.uuid4().hex[:10].upper()}"
+            self.server.transactions.append(reference)
+            result = f'<div class="success-message">Top-up of ₱{amount} successful!</div>'
+            if 'transaction_id' not in self.server.omit:
+                result += f'<div class="transaction-reference">{reference}</div>'
+
+        if 'in_place' in parse_qs(url.query):
+            self._send(json.dumps({'result': result}), 'application/json')
+            return
+        page = (CONFIRMATION_PAGE.replace('__RESULT__', json.dumps(result))
+                .replace('__RENDER_DELAY_MS__', str(self._render_delay_ms())))
+        self._send(page)
+
+
+class MockTopUpServer(ThreadingHTTPServer):
+    """Mock top-up site running on a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, render_delay=0.0, response_delay=0.0,
+                 omit=(), decline=False, verbose=False, in_place=False):
+        super().__init__((host, port), MockSiteHandler)
+        self.render_delay = render_delay
+        self.response_delay = response_delay
+        self.omit = set(omit)
+        self.decline = decline
+        self.in_place = in_place
+        self.verbose = verbose
+        self.transactions = []
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{TOP_UP_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-site", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the mock PandaPay top-up site")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--render-delay', type=float, default=0.0, help="seconds before the page renders its content")
+    parser.add_argument('--response-delay', type=float, default=0.0, help="seconds the server takes to answer fee and payment requests")
+    parser.add_argument('--omit', nargs='*', default=[], metavar='SELECTOR',
+                        help=f"elements to leave out: {', '.join(list(FORM_ELEMENTS) + ['transaction_id'])}")
+    parser.add_argument('--decline', action='store_true', help="answer every payment with an error message")
+    parser.add_argument('--in-place', action='store_true',
+                        help="submit with fetch() and show the outcome on the form page (single-page checkout)")
+    args = parser.parse_args()
+
+    server = MockTopUpServer(args.host, args.port, args.render_delay, args.response_delay,
+                             args.omit, args.decline, verbose=True, in_place=args.in_place)
+    print(f"Mock top-up site running at {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Memory and CPU of the driver and browser processes.
+
+Configured by ``browser_settings.monitor`` in config.json::
+
+    "monitor": {
+        "enabled": true,
+        "interval": 0.5,
+        "max_rss_mb": 2048,
+        "max_cpu_percent": null
+    }
+
+While a timing span is open, a background thread samples the process tree
+under the driver (geckodriver -> firefox -> content processes, or
+chromedriver -> chrome -> renderers) every ``interval`` seconds, and once
+more when the span ends. The span gets the peaks of ``rss_mb`` (resident
+memory summed over the tree) and ``cpu_percent`` (CPU used since the
+previous sample, summed, so 200 is two busy cores). The daemon and job runs
+restart the browser between top-ups once either limit is crossed. Needs psutil; without it monitoring
+is off and nothing else changes.
+"""
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_MONITOR = {
+    'enabled': True,
+    'interval': 0.5,
+    'max_rss_mb': 2048,
+    'max_cpu_percent': None,
+}
+
+
+def monitor_settings(browser_settings):
+    """The effective monitor settings, or None when monitoring is off"""
+    settings = {**DEFAULT_MONITOR, **browser_settings.get('monitor', {})}
+    if not settings['enabled']:
+        return None
+    interval = settings['interval']
+    if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+        raise ValueError(f"interval must be a positive number of seconds, not {interval!r}")
+    for key in ('max_rss_mb', 'max_cpu_percent'):
+        value = settings[key]
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            raise ValueError(f"{key} must be a positive number or null, not {value!r}")
+    return settings
+
+
+# Samples kept for span windows; at the default interval this covers over an hour of open spans
+HISTORY_LENGTH = 10000
+
+
+class ResourceMonitor:
+    """Samples the process tree of one WebDriver; attach() it after every launch"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.last_sample = None
+        self._root = None
+        self._processes = {}
+        self._history = deque(maxlen=HISTORY_LENGTH)
+        self._open_spans = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def attach(self, driver):
+        """Start watching the driver process of ``driver`` (and everything it spawns)"""
+        self.detach()
+        if not self.settings:
+            return
+        try:
+            import psutil
+        except ImportError:
+            print("psutil is not installed - browser resource monitoring is off")
+            self.settings = None
+            return
+        try:
+            self._root = psutil.Process(driver.service.process.pid)
+        except (AttributeError, psutil.Error):
+            self._root = None
+        # The first cpu_percent() of a process is always 0; take it now so the first span is real
+        self.sample()
+        self._stop = threading.Event()
+        threading.Thread(target=self._sample_while_spans_open, args=(self._stop,),
+                         name="resource-monitor", daemon=True).start()
+
+    def detach(self):
+        self._stop.set()
+        with self._lock:
+            self._root = None
+            self._processes = {}
+            self._history.clear()
+            self.last_sample = None
+
+    def _sample_while_spans_open(self, stop):
+        while not stop.wait(self.settings['interval']):
+            if self._open_spans:
+                self.sample()
+
+    def span_started(self):
+        """A timing span opened: sample on the interval until it ends"""
+        with self._lock:
+            self._open_spans += 1
+
+    def span_usage(self, since):
+        """End a span opened at ``since`` (a perf_counter value): its peak rss_mb and cpu_percent, or None"""
+        self.sample()
+        with self._lock:
+            self._open_spans -= 1
+            window = [usage for taken, usage in reversed(self._history) if taken >= since]
+        if not window:
+            return None
+        return {'rss_mb': max(usage['rss_mb'] for usage in window),
+                'cpu_percent': max(usage['cpu_percent'] for usage in window)}
+
+    def sample(self):
+        """{'rss_mb', 'cpu_percent', 'processes'} for the tree right now, or None if nothing is attached"""
+        with self._lock:
+            if self._root is None:
+                return None
+            import psutil
+
+            try:
+                tree = [self._root] + self._root.children(recursive=True)
+            except psutil.Error:
+                # The driver exited; its browser goes with it
+                self._root = None
+                return None
+
+            rss = 0
+            cpu = 0.0
+            processes = {}
+            for process in tree:
+                # Keep the Process objects: cpu_percent() measures since the previous call on the same one
+                process = self._processes.get(process.pid, process)
+                try:
+                    with process.oneshot():
+                        rss += process.memory_info().rss
+                        cpu += process.cpu_percent(None)
+                except psutil.Error:
+                    continue
+                processes[process.pid] = process
+            self._processes = processes
+            self.last_sample = {'rss_mb': round(rss / (1024 * 1024), 1), 'cpu_percent': round(cpu, 1),
+                                'processes': len(processes)}
+            self._history.append((time.perf_counter(), self.last_sample))
+            return self.last_sample
+
+    def over_threshold(self):
+        """Why the browser should be restarted now (a fresh sample crossed a limit), or None"""
+        usage = self.sample()
+        if not usage:
+            return None
+        max_rss = self.settings['max_rss_mb']
+        max_cpu = self.settings['max_cpu_percent']
+        if max_rss and usage['rss_mb'] > max_rss:
+            return f"browser memory at {usage['rss_mb']:.0f} MB (limit {max_rss} MB)"
+        if max_cpu and usage['cpu_percent'] > max_cpu:
+            return f"browser CPU at {usage['cpu_percent']:.0f}% (limit {max_cpu}%)"
+        return None
@@ -1,45 +1,94 @@
-import json
-import tkinter as tk
-from tkinter import messagebox, simpledialog
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from openpyxl import Workbook, load_workbook
+import math
+import sys
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from datetime import datetime
-import os
 import time
 
+from backend_state import BackendState
+from batch_fill import BatchFiller
+from confirmation import ConfirmationWatcher
+from driver_cache import DriverCache
+from driver_log import service_options
+from fast_load import apply_chrome_blocking, chrome_preferences, firefox_preferences
+from ledger import RUNNABLE_JOB_STATUSES, open_journal
+from locators import ElementFinder
+from monitor import ResourceMonitor
+from session import SessionCache
+from settings import ConfigError, load_settings
+from timing import RunTimer
+from waits import Waiter, field_value_committed, network_idle
+from warmup import BrowserWarmup
+
+
+# Process exit codes for the non-interactive run, by result status
+EXIT_CODES = {
+    'success': 0,
+    'failed': 1,        # crashed or no browser could be started
+    'invalid': 2,       # unknown card or bad amount
+    'error': 3,         # declined by the site
+    'timeout': 4,       # submitted but unconfirmed: check it manually
+    'form_failed': 5,   # never submitted
+    'cancelled': 6,     # dialogs closed without paying
+    'skipped': 7,       # idempotency key already used by an earlier attempt
+}
+
+# Why a job whose idempotency key already has a journal entry is not run again
+JOB_SKIP_REASONS = {
+    'done': "Skipped: already paid under idempotency key '{key}'",
+    'unconfirmed': ("Skipped: submitted earlier under idempotency key '{key}' but never confirmed - "
+                    "check it manually, then run: python ledger.py resolve {key} done|failed"),
+    'pending': ("Skipped: an earlier attempt with idempotency key '{key}' was interrupted - "
+                "check it manually, then run: python ledger.py resolve {key} done|failed"),
+}
+# Accepted top-up amounts, for the dialog and for CLI/daemon/job input alike
+MIN_AMOUNT = 0.01
+MAX_AMOUNT = 99999.99
+
 
 class PaymentAutomation:
-    def __init__(self):
-        self.config = self.load_config()
+    def __init__(self, config_path='config.json', interactive=True):
+        started = time.perf_counter()
+        self.config_path = config_path
+        self.interactive = interactive
+        self.settings = self.load_config()
+        self.config = self.settings.raw if self.settings else None
+        self.monitor = ResourceMonitor(self.settings.monitor if self.settings else None)
+        self.timer = RunTimer(self.settings.timings_file if self.settings else None, self.monitor)
+        self.timer.record('config_load', time.perf_counter() - started, 'ok' if self.settings else 'error',
+                          config=self.settings.fingerprint[:12] if self.settings else None)
+        self.session = SessionCache(self.settings.session, self.settings.url) if self.settings else None
         self.driver = None
+        self.backend = None
+        self.waiter = None
+        self.elements = None
         self.selected_card = None
         
     def load_config(self):
-        """Load configuration from config.json file"""
+        """Load and validate config.json, before anything slow starts (see settings.py)"""
         try:
-            with open('config.json', 'r') as file:
-                return json.load(file)
+            return load_settings(self.config_path)
         except FileNotFoundError:
-            messagebox.showerror("Error", "config.json file not found!")
-            return None
-        except json.JSONDecodeError:
-            messagebox.showerror("Error", "Invalid JSON format in config.json!")
-            return None
+            self.report_error(f"{self.config_path} file not found!")
+        except OSError as e:
+            self.report_error(f"Could not read {self.config_path}: {e}")
+        except ConfigError as e:
+            self.report_error(f"Invalid {self.config_path}:\n" + "\n".join(f"- {problem}" for problem in e.problems))
+        return None
+    
+    def report_error(self, message):
+        """Print an error, and show it in a message box when running interactively"""
+        print(message)
+        if self.interactive:
+            from tkinter import messagebox
+            messagebox.showerror("Error", message)
     
     def show_card_selection(self):
         """Display a popup window for card selection"""
         if not self.config:
             return None
-            
+        
+        import tkinter as tk
+        
         root = tk.Tk()
         root.title("Select Payment Card")
         root.geometry("400x300")
@@ -70,8 +119,8 @@ class PaymentAutomation:
         button_frame = tk.Frame(root)
         button_frame.pack(pady=20)
         
-        for i, card in enumerate(self.config['cards']):
-            card_text = f"{card['name']}\n****-****-****-{card['number'][-4:]}"
+        for card in self.settings.cards.values():
+            card_text = f"{card.name}\n{card.masked_number}"
             btn = tk.Button(button_frame, text=card_text, width=25, height=3,
                            command=lambda c=card: on_card_select(c),
                            font=("Arial", 10), relief="raised", bd=2)
@@ -87,78 +136,139 @@ class PaymentAutomation:
     
     def get_payment_amount(self):
         """Get payment amount from user"""
+        import tkinter as tk
+        from tkinter import simpledialog
+        
         root = tk.Tk()
         root.withdraw()  # Hide the main window
         
         amount = simpledialog.askfloat("Payment Amount", 
                                       "Enter the payment amount:",
-                                      minvalue=0.01, maxvalue=99999.99)
+                                      minvalue=MIN_AMOUNT, maxvalue=MAX_AMOUNT)
         root.destroy()
         return amount
     
+    def _launch_firefox(self, driver_cache):
+        """Start Firefox through the cached geckodriver"""
+        from selenium import webdriver
+        from selenium.webdriver.firefox.options import Options as FirefoxOptions
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+        
+        print("Setting up Firefox WebDriver...")
+        firefox_options = FirefoxOptions()
+        
+        if self.settings.headless:
+            firefox_options.add_argument('--headless')
+        
+        firefox_options.add_argument('--disable-blink-features=AutomationControlled')
+        firefox_options.set_preference("dom.webdriver.enabled", False)
+        firefox_options.set_preference('useAutomationExtension', False)
+        
+        window_size = self.settings.window_size
+        firefox_options.add_argument(f'--width={window_size[0]}')
+        firefox_options.add_argument(f'--height={window_size[1]}')
+        
+        # Eager loading and resource blocking (browser_settings.fast_load)
+        fast_load = self.settings.fast_load
+        if fast_load:
+            firefox_options.page_load_strategy = fast_load['page_load_strategy']
+            for name, value in firefox_preferences(fast_load).items():
+                firefox_options.set_preference(name, value)
+        
+        # Persistent profile keeps the login between runs (session.mode = profile)
+        profile = self.session.profile_path('firefox')
+        if profile:
+            firefox_options.add_argument('-profile')
+            firefox_options.add_argument(profile)
+        
+        geckodriver = driver_cache.resolve('geckodriver', browser='firefox')
+        if not geckodriver:
+            raise Exception("geckodriver is not in the driver cache")
+        # Leveled, rotated log under browser_settings.driver_log (see driver_log.py)
+        service = FirefoxService(geckodriver, **service_options('geckodriver', self.settings.driver_log))
+        return webdriver.Firefox(service=service, options=firefox_options)
+    
+    def _launch_chrome(self, driver_cache):
+        """Start Chrome through the cached chromedriver"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        
+        print("Setting up Chrome WebDriver...")
+        chrome_options = Options()
+        
+        if self.settings.headless:
+            chrome_options.add_argument('--headless')
+        
+        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-web-security')
+        chrome_options.add_argument('--allow-running-insecure-content')
+        
+        window_size = self.settings.window_size
+        chrome_options.add_argument(f'--window-size={window_size[0]},{window_size[1]}')
+        
+        # Eager loading and resource blocking (browser_settings.fast_load)
+        fast_load = self.settings.fast_load
+        if fast_load:
+            chrome_options.page_load_strategy = fast_load['page_load_strategy']
+            chrome_options.add_experimental_option('prefs', chrome_preferences(fast_load))
+        
+        # Persistent profile keeps the login between runs (session.mode = profile)
+        profile = self.session.profile_path('chrome')
+        if profile:
+            chrome_options.add_argument(f'--user-data-dir={profile}')
+        
+        chromedriver = driver_cache.resolve('chromedriver', browser='chrome')
+        if not chromedriver:
+            raise Exception("chromedriver is not in the driver cache")
+        print(f"Using cached ChromeDriver: {chromedriver}")
+        service = Service(chromedriver, **service_options('chromedriver', self.settings.driver_log))
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        if fast_load:
+            apply_chrome_blocking(driver, fast_load)
+        return driver
+    
     def setup_driver(self):
-        """Setup WebDriver with specified options - tries Firefox first, then Chrome"""
+        """Setup WebDriver - tries the last backend that worked first, then the others"""
+        # selenium.webdriver is imported on first use; time that apart from the launch
+        with self.timer.span('selenium_import'):
+            import selenium.webdriver  # noqa: F401
+        with self.timer.span('setup_driver') as span:
+            self._setup_driver()
+            span.attributes['backend'] = self.backend
+    
+    def _setup_driver(self):
+        # Drivers come from the local cache only; run setup_chromedriver.py to populate it
+        driver_cache = DriverCache(self.settings.driver_cache_dir)
+        backend_state = BackendState(self.settings.browser_state_file)
+        launchers = {'firefox': self._launch_firefox, 'chrome': self._launch_chrome}
         
-        # Try Firefox first (more reliable)
-        try:
-            print("Setting up Firefox WebDriver...")
-            firefox_options = FirefoxOptions()
-            
-            if self.config['browser_settings']['headless']:
-                firefox_options.add_argument('--headless')
-            
-            firefox_options.add_argument('--disable-blink-features=AutomationControlled')
-            firefox_options.set_preference("dom.webdriver.enabled", False)
-            firefox_options.set_preference('useAutomationExtension', False)
-            
-            window_size = self.config['browser_settings']['window_size']
-            firefox_options.add_argument(f'--width={window_size[0]}')
-            firefox_options.add_argument(f'--height={window_size[1]}')
-            
-            service = FirefoxService(GeckoDriverManager().install())
-            self.driver = webdriver.Firefox(service=service, options=firefox_options)
-            print("Firefox WebDriver initialized successfully!")
-            
-        except Exception as e:
-            print(f"Firefox setup failed: {e}")
-            print("Trying Chrome as fallback...")
-            
-            # Fallback to Chrome
-            chrome_options = Options()
-            
-            if self.config['browser_settings']['headless']:
-                chrome_options.add_argument('--headless')
-            
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-web-security')
-            chrome_options.add_argument('--allow-running-insecure-content')
-            
-            window_size = self.config['browser_settings']['window_size']
-            chrome_options.add_argument(f'--window-size={window_size[0]},{window_size[1]}')
-            
+        for backend in backend_state.launch_order(self.settings.backend):
+            started = time.perf_counter()
             try:
-                # First, try to use local ChromeDriver if it exists
-                local_chromedriver = os.path.join(os.getcwd(), "chromedriver.exe")
-                if os.path.exists(local_chromedriver):
-                    print("Using local ChromeDriver...")
-                    service = Service(local_chromedriver)
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                else:
-                    # Try to get ChromeDriver automatically
-                    print("Downloading ChromeDriver automatically...")
-                    service = Service(ChromeDriverManager().install())
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            except Exception as e2:
-                print(f"Chrome setup also failed: {e2}")
-                print("\nSolutions:")
-                print("1. Install Firefox: https://www.mozilla.org/firefox/")
-                print("2. Or downgrade Chrome to version 131 or lower")
-                print("3. Or run: python setup_chromedriver.py")
-                raise Exception("Could not initialize any WebDriver.")
+                self.driver = launchers[backend](driver_cache)
+            except Exception as e:
+                print(f"{backend.capitalize()} setup failed: {e}")
+                backend_state.record_failure(backend, e)
+                continue
+            
+            launch_seconds = time.perf_counter() - started
+            self.monitor.attach(self.driver)
+            backend_state.record_success(backend, launch_seconds)
+            self.backend = backend
+            print(f"{backend.capitalize()} WebDriver initialized successfully in {launch_seconds:.1f}s!")
+            break
+        else:
+            print("\nSolutions:")
+            print("1. Run: python setup_chromedriver.py (populates the driver cache)")
+            print("2. Install Firefox: https://www.mozilla.org/firefox/")
+            print("3. Or downgrade Chrome to match a cached ChromeDriver (python setup_chromedriver.py --list)")
+            print("4. Or set browser_settings.backend to \"auto\" to allow falling back")
+            raise Exception("Could not initialize any WebDriver.")
         
         # Set anti-detection properties
         try:
@@ -166,39 +276,52 @@ class PaymentAutomation:
         except:
             pass  # Firefox might not support this
             
-        implicit_wait = self.config['browser_settings']['implicit_wait']
-        self.driver.implicitly_wait(implicit_wait)
+        # Lookups wait per selector (see locators.py), so the implicit wait should stay at 0
+        self.driver.implicitly_wait(self.settings.implicit_wait)
+        self.waiter = Waiter(self.driver, self.settings.waits)
+        self.elements = ElementFinder(self.waiter, self.settings.selectors)
+        
+        # Bring back the saved login before the first navigation (session.mode = cookies)
+        restored = self.session.restore(self.driver)
+        if restored:
+            print(f"Restored {restored} saved session cookies")
     
     def login_to_foodpanda(self):
-        """Login to FoodPanda if required"""
+        """Login to FoodPanda if required (i.e. the saved session, if any, has expired)"""
         try:
             print("Checking if login is required...")
             
-            # Check if we're on login page or need to login
-            if "login" in self.driver.current_url.lower() or self.driver.find_elements(By.CSS_SELECTOR, self.config['website']['selectors']['login_email']):
+            # The page renders either the top-up form or a login form, possibly after a delay:
+            # wait for whichever comes first
+            page = self.elements.first_of(('login_email', 'amount_input'),
+                                          self.elements.schema['amount_input'].timeout)
+            if "login" in self.driver.current_url.lower() or page == 'login_email':
                 print("Login required. Logging in...")
+                self.session.clear()
                 
                 # Fill email
-                email_field = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, self.config['website']['selectors']['login_email']))
-                )
+                email_field = self.elements.find('login_email')
                 email_field.clear()
-                email_field.send_keys(self.config['foodpanda_login']['email'])
+                email_field.send_keys(self.settings.login_email)
                 
                 # Fill password
-                password_field = self.driver.find_element(
-                    By.CSS_SELECTOR, self.config['website']['selectors']['login_password'])
+                password_field = self.elements.find('login_password')
                 password_field.clear()
-                password_field.send_keys(self.config['foodpanda_login']['password'])
+                password_field.send_keys(self.settings.login_password)
                 
                 # Click login button
-                login_btn = self.driver.find_element(
-                    By.CSS_SELECTOR, self.config['website']['selectors']['login_button'])
+                login_btn = self.elements.find('login_button', clickable=True)
                 login_btn.click()
                 
-                # Wait for login to complete
-                time.sleep(3)
+                # Wait for the login form to be replaced by the next page
+                from selenium.webdriver.support import expected_conditions as EC
+                self.waiter.settle(EC.staleness_of(login_btn), 'login', "Login redirect")
                 print("Login completed!")
+                self.session.save(self.driver)
+                
+                # Login usually lands somewhere else; go back to the top-up page
+                if self.driver.current_url != self.settings.url:
+                    self.driver.get(self.settings.url)
                 
             return True
             
@@ -206,97 +329,51 @@ class PaymentAutomation:
             print(f"Login process failed: {str(e)}")
             return False
 
-    def fill_payment_form(self, amount):
+    def fill_payment_form(self, amount, navigate=True):
         """Fill out the FoodPanda Philippines PandaPay top-up form"""
+        timer = self.timer
         try:
-            # Navigate to FoodPanda PandaPay top-up page
-            print(f"Navigating to {self.config['website']['url']}...")
-            self.driver.get(self.config['website']['url'])
+            # Navigate to FoodPanda PandaPay top-up page (skipped when the warm-up already did)
+            if navigate:
+                print(f"Navigating to {self.settings.url}...")
+                with timer.span('navigation'):
+                    self.driver.get(self.settings.url)
+            
+            # The top-up page doubles as the session check: only log in if it asks for it
+            with timer.span('session_check') as span:
+                if not self.login_to_foodpanda():
+                    span.outcome = 'failed'
+                    return False
             
             # Wait for the page to load
             print("Waiting for FoodPanda page to load...")
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 
-                    self.config['website']['selectors']['amount_input']))
-            )
+            with timer.span('page_ready'):
+                amount_field = self.elements.find('amount_input')
+                self.waiter.track_network()
             
             print("✅ FoodPanda PandaPay page loaded successfully!")
             
-            # Fill top-up amount
-            print(f"Entering top-up amount: ₱{amount}")
-            amount_field = self.driver.find_element(
-                By.CSS_SELECTOR, self.config['website']['selectors']['amount_input'])
-            amount_field.clear()
-            amount_field.send_keys(str(amount))
-            
-            # Wait for amount to be processed
-            time.sleep(2)
-            
-            # Select Credit/Debit Card payment method if not already selected
-            try:
-                print("Selecting Credit/Debit Card payment method...")
-                credit_card_radio = self.driver.find_element(
-                    By.CSS_SELECTOR, self.config['website']['selectors']['credit_card_option'])
-                if not credit_card_radio.is_selected():
-                    credit_card_radio.click()
-                    time.sleep(1)
-            except:
-                print("Credit card option already selected or not found...")
-            
-            # Wait for card form to appear and fill card details
-            print("Filling card details...")
-            
-            # Fill card number
-            card_number_field = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 
-                    self.config['website']['selectors']['card_number']))
-            )
-            card_number_field.clear()
-            card_number_field.send_keys(self.selected_card['number'])
-            time.sleep(1)
-            
-            # Fill expiry date (MM/YY format)
-            expiry_field = self.driver.find_element(
-                By.CSS_SELECTOR, self.config['website']['selectors']['expiry_date'])
-            expiry_field.clear()
-            # Convert MM/YY format (e.g., "12/25" stays as "12/25")
-            expiry_formatted = self.selected_card['expiry']
-            expiry_field.send_keys(expiry_formatted)
-            time.sleep(1)
-            
-            # Fill CVC
-            cvc_field = self.driver.find_element(
-                By.CSS_SELECTOR, self.config['website']['selectors']['cvc'])
-            cvc_field.clear()
-            cvc_field.send_keys(self.selected_card['cvc'])
-            time.sleep(1)
-            
-            # Fill cardholder name
-            print("Filling cardholder name...")
-            cardholder_field = self.driver.find_element(
-                By.CSS_SELECTOR, self.config['website']['selectors']['cardholder_name'])
-            cardholder_field.clear()
-            cardholder_field.send_keys(self.selected_card.get('holder_name', 'John Doe'))
+            fields = self.card_field_values(amount)
+            if self.settings.fill_mode == 'batched':
+                self._fill_fields_batched(fields)
+            else:
+                self._fill_fields(amount_field, fields)
             
-            # Wait for all fields to be processed
-            time.sleep(3)
+            # Wait for card validation requests to finish before paying
+            with timer.span('card_validation'):
+                self.waiter.settle(network_idle(), 'network_idle', "Card validation")
             
-            # Look for and click the Pay button
+            # Look for and click the Pay button (its locator chain falls back to the submit button)
             print("Looking for Pay button...")
-            try:
-                # Try to find Pay button by text
-                pay_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Pay')]")
-                pay_button.click()
-                print("Clicked Pay button!")
-            except:
-                # Fallback to submit button
+            with timer.span('pay_click') as span:
                 try:
-                    submit_btn = self.driver.find_element(
-                        By.CSS_SELECTOR, self.config['website']['selectors']['submit_button'])
-                    submit_btn.click()
-                    print("Clicked Submit button!")
-                except:
+                    pay_button = self.elements.find('pay_button', clickable=True)
+                    ConfirmationWatcher(self.driver, self.elements).mark_form_page()
+                    pay_button.click()
+                    print("Clicked Pay button!")
+                except TimeoutException:
                     print("Could not find Pay or Submit button")
+                    span.outcome = 'not_found'
                     return False
             
             return True
@@ -305,126 +382,386 @@ class PaymentAutomation:
             print(f"Error filling FoodPanda form: {str(e)}")
             return False
     
-    def capture_confirmation(self):
-        """Capture confirmation message and transaction ID"""
-        try:
-            # Wait for confirmation page to load
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 
-                    self.config['website']['selectors']['confirmation_message']))
-            )
-            
-            # Get confirmation message
-            confirmation_element = self.driver.find_element(
-                By.CSS_SELECTOR, self.config['website']['selectors']['confirmation_message'])
-            confirmation_message = confirmation_element.text
+    def card_field_values(self, amount):
+        """Values to enter, keyed by selector name"""
+        return {
+            'amount_input': str(amount),
+            'card_number': self.selected_card.number,
+            # MM/YY format (e.g., "12/25" stays as "12/25")
+            'expiry_date': self.selected_card.expiry,
+            'cvc': self.selected_card.cvc,
+            'cardholder_name': self.selected_card.holder_name,
+        }
+    
+    def _fill_fields(self, amount_field, fields):
+        """Fill the form one WebDriver command at a time, waiting for each field to commit"""
+        # Fill top-up amount
+        print(f"Entering top-up amount: ₱{fields['amount_input']}")
+        with self.timer.span('fill.amount'):
+            amount_field.clear()
+            amount_field.send_keys(fields['amount_input'])
             
-            # Get transaction ID
-            transaction_id = "N/A"
+            # Wait for the amount to be accepted and for any fee lookup it triggers
+            self.waiter.settle(field_value_committed(amount_field, fields['amount_input'], numeric=True), 'field_commit', "Amount")
+            self.waiter.settle(network_idle(), 'network_idle', "Amount processing")
+        
+        # Select Credit/Debit Card payment method if not already selected
+        print("Selecting Credit/Debit Card payment method...")
+        with self.timer.span('fill.payment_method') as span:
+            credit_card_radio = self.elements.find('credit_card_option')
+            if credit_card_radio is None:
+                print("Credit card option not found, assuming it is already selected...")
+                span.outcome = 'not_found'
+            elif not credit_card_radio.is_selected():
+                credit_card_radio.click()
+        
+        # Wait for card form to appear and fill card details
+        print("Filling card details...")
+        
+        # Fill card number
+        with self.timer.span('fill.card_number'):
+            card_number_field = self.elements.find('card_number', clickable=True)
+            card_number_field.clear()
+            card_number_field.send_keys(fields['card_number'])
+            self.waiter.settle(field_value_committed(card_number_field, fields['card_number']),
+                               'field_commit', "Card number")
+        
+        # Fill expiry date (MM/YY format)
+        with self.timer.span('fill.expiry_date'):
+            expiry_field = self.elements.find('expiry_date')
+            expiry_field.clear()
+            expiry_field.send_keys(fields['expiry_date'])
+            self.waiter.settle(field_value_committed(expiry_field, fields['expiry_date']),
+                               'field_commit', "Expiry date")
+        
+        # Fill CVC
+        with self.timer.span('fill.cvc'):
+            cvc_field = self.elements.find('cvc')
+            cvc_field.clear()
+            cvc_field.send_keys(fields['cvc'])
+            self.waiter.settle(field_value_committed(cvc_field, fields['cvc']),
+                               'field_commit', "CVC")
+        
+        # Fill cardholder name
+        print("Filling cardholder name...")
+        with self.timer.span('fill.cardholder_name'):
+            cardholder_field = self.elements.find('cardholder_name')
+            cardholder_field.clear()
+            cardholder_field.send_keys(fields['cardholder_name'])
+            self.waiter.settle(field_value_committed(cardholder_field, fields['cardholder_name']),
+                               'field_commit', "Cardholder name")
+    
+    def _fill_fields_batched(self, fields):
+        """Locate every field in one script call and fill all but the key-event fields in another"""
+        filler = BatchFiller(self.driver, self.elements)
+        
+        with self.timer.span('fill.locate') as span:
+            found, missing = filler.locate(list(fields) + ['credit_card_option'])
+            span.attributes['missing'] = missing
+        if missing:
+            print(f"Not on the page yet: {', '.join(missing)}")
+        
+        # Selecting the payment method may be what reveals the card fields
+        radio = found.pop('credit_card_option', None)
+        if radio is not None:
+            with self.timer.span('fill.payment_method'):
+                filler.fill([('check', radio)])
+        for name in missing:
+            if name in fields:
+                found[name] = self.elements.find(name)
+        
+        typed = [name for name in fields if self.elements.schema[name].key_events]
+        batched = [name for name in fields if name not in typed and found.get(name) is not None]
+        
+        print(f"Filling {len(batched)} fields in one batch...")
+        with self.timer.span('fill.batch', fields=batched) as span:
+            values = filler.fill([('set', found[name], fields[name]) for name in batched])
+            # Anything the page rejected or reformatted unexpectedly is typed instead
+            rejected = [name for name, value in zip(batched, values)
+                        if not field_value_committed(found[name], fields[name], name == 'amount_input').matches(value)]
+            if rejected:
+                span.outcome = 'partial'
+                print(f"Batch fill not accepted for {', '.join(rejected)}, typing instead...")
+        
+        for name in typed + rejected:
+            with self.timer.span(f'fill.{name}'):
+                element = found.get(name) or self.elements.find(name)
+                element.clear()
+                element.send_keys(fields[name])
+                self.waiter.settle(field_value_committed(element, fields[name], name == 'amount_input'),
+                                   'field_commit', name)
+    
+    def capture_confirmation(self):
+        """Wait for the payment outcome and return its status, message, transaction ID and error text"""
+        with self.timer.span('confirmation') as span:
             try:
-                transaction_element = self.driver.find_element(
-                    By.CSS_SELECTOR, self.config['website']['selectors']['transaction_id'])
-                transaction_id = transaction_element.text
-            except:
+                watcher = ConfirmationWatcher(self.driver, self.elements, self.waiter.poll_interval)
+                result = watcher.wait()
+            except Exception as e:
+                print(f"Error capturing confirmation: {str(e)}")
+                result = {'status': 'timeout', 'message': '', 'transaction_id': None, 'error': str(e)}
+            span.outcome = result['status']
+        
+        if result['status'] == 'timeout':
+            result['message'] = "Error capturing confirmation"
+        if not result['transaction_id']:
+            if result['status'] == 'success':
                 print("Transaction ID element not found, using 'N/A'")
-            
-            return confirmation_message, transaction_id
-            
-        except Exception as e:
-            print(f"Error capturing confirmation: {str(e)}")
-            return "Error capturing confirmation", "N/A"
+            result['transaction_id'] = "N/A"
+        return result
     
-    def save_to_excel(self, amount, confirmation_message, transaction_id):
-        """Save transaction details to Excel file"""
-        excel_file = self.config['excel_file']
-        
-        # Create or load workbook
-        if os.path.exists(excel_file):
-            workbook = load_workbook(excel_file)
-            worksheet = workbook.active
-        else:
-            workbook = Workbook()
-            worksheet = workbook.active
-            # Add headers
-            headers = ['Date', 'Time', 'Card Used', 'Amount', 'Transaction ID', 'Confirmation Message']
-            worksheet.append(headers)
+    def open_journal(self, import_legacy=False):
+        return open_journal(self.settings.journal_file, self.settings.excel_file if import_legacy else None)
+    
+    def prepare_journal(self):
+        """Create the journal (importing a legacy transactions.xlsx) before a payment depends on it"""
+        with self.open_journal(import_legacy=True):
+            pass
+    
+    def save_transaction(self, amount, confirmation_message, transaction_id, idempotency_key=None,
+                         job_status='done'):
+        """Record transaction details in the journal (and optionally refresh the Excel export)"""
+        excel_file = self.settings.excel_file
         
         # Prepare data
         current_time = datetime.now()
         date_str = current_time.strftime("%Y-%m-%d")
         time_str = current_time.strftime("%H:%M:%S")
-        card_name = self.selected_card['name']
+        card_name = self.selected_card.name
+        
+        with self.timer.span('save_transaction'), self.open_journal() as journal:
+            journal.record(date_str, time_str, card_name, amount, transaction_id, confirmation_message,
+                           idempotency_key, job_status)
+            print(f"Transaction recorded in {journal.path}")
+            
+            if self.settings.export_after_save:
+                journal.export_excel(excel_file)
+                print(f"Transaction history exported to {excel_file}")
+            else:
+                print(f"Run 'python ledger.py export' to update {excel_file}")
+    
+    def process_payment(self, amount, navigate=True, idempotency_key=None):
+        """Fill, submit and confirm one top-up with the selected card, recording it in the journal.
+        
+        Returns the confirmation dict; its status is 'success', 'error' (declined),
+        'timeout' (submitted but unconfirmed) or 'form_failed' (never submitted).
+        A claimed ``idempotency_key`` is settled in the same journal commit.
+        """
+        # Fill payment form
+        print("Filling payment form...")
+        with self.timer.span('fill_payment_form') as span:
+            form_submitted = self.fill_payment_form(amount, navigate=navigate)
+            if not form_submitted:
+                span.outcome = 'failed'
+        if not form_submitted:
+            print("Failed to fill payment form.")
+            return {'status': 'form_failed', 'message': '', 'transaction_id': "N/A",
+                    'error': "Failed to fill payment form."}
+        print("Form submitted successfully!")
+        
+        # Capture confirmation
+        print("Capturing confirmation...")
+        confirmation = self.capture_confirmation()
+        
+        if confirmation['status'] == 'error':
+            # The site rejected the payment, so there is nothing to record
+            print(f"Payment failed: {confirmation['error']}")
+            return confirmation
+        
+        # Record in the transaction journal (unconfirmed payments too, for manual checking)
+        print("Recording transaction...")
+        self.save_transaction(amount, confirmation['message'], confirmation['transaction_id'], idempotency_key,
+                              'unconfirmed' if confirmation['status'] == 'timeout' else 'done')
+        
+        if confirmation['status'] == 'timeout':
+            print("No confirmation received - please check the payment manually.")
+        else:
+            print("Payment automation completed successfully!")
+        return confirmation
+    
+    def show_payment_result(self, result):
+        """Report a top_up() result in a message box"""
+        from tkinter import messagebox
+        
+        if result['status'] == 'success':
+            messagebox.showinfo("Success", 
+                f"Payment processed successfully!\nTransaction ID: {result['transaction_id']}")
+        elif result['status'] == 'timeout':
+            messagebox.showwarning("Unconfirmed",
+                "The payment was submitted but no confirmation appeared.\nPlease check it manually.")
+        elif result['status'] == 'error':
+            messagebox.showerror("Payment Failed", result['error'])
+        else:
+            messagebox.showerror("Error", result['error'])
+    
+    def top_up(self, card_name, amount, navigate=True, idempotency_key=None):
+        """Pay ``amount`` with the configured card named ``card_name``, without any GUI.
+        
+        Uses the running browser if there is one; otherwise launches one and closes
+        it again afterwards. Returns a dict with the process_payment() fields plus
+        card, amount, run_id and per-phase timings in ms. Besides the process_payment()
+        statuses, 'invalid' means a bad card or amount and 'failed' that the run crashed
+        (or never started because the journal could not be opened).
+        
+        With an ``idempotency_key`` the job is claimed in the journal before anything
+        is submitted, and a key that has already paid (or might have) is 'skipped'.
+        """
+        result = {'status': 'failed', 'message': '', 'transaction_id': "N/A", 'error': None,
+                  'card': card_name, 'amount': amount}
+        card = self.settings.cards.get(card_name) if self.settings else None
+        runnable = False
+        if card is None:
+            result.update(status='invalid', error=f"Unknown card '{card_name}'")
+        elif (isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount)
+              or not MIN_AMOUNT <= amount <= MAX_AMOUNT):
+            result.update(status='invalid', error=f"Invalid amount '{amount}' (must be {MIN_AMOUNT}-{MAX_AMOUNT:,})")
+        else:
+            try:
+                self.prepare_journal()
+                runnable = True
+            except Exception as e:
+                result['error'] = f"Transaction journal unavailable, nothing was paid: {e}"
+                print(result['error'])
+        if runnable and idempotency_key:
+            with self.open_journal() as journal:
+                previous = journal.claim_job(idempotency_key, card_name, amount)
+            if previous not in RUNNABLE_JOB_STATUSES:
+                runnable = False
+                result.update(status='skipped', previous_status=previous,
+                              error=JOB_SKIP_REASONS[previous].format(key=idempotency_key))
+                print(result['error'])
         
-        # Add transaction data
-        row_data = [date_str, time_str, card_name, amount, transaction_id, confirmation_message]
-        worksheet.append(row_data)
+        if runnable:
+            self.selected_card = card
+            launched_here = self.driver is None
+            payment_started = False
+            try:
+                if launched_here:
+                    print("Setting up browser...")
+                    self.setup_driver()
+                payment_started = True
+                result.update(self.process_payment(amount, navigate=navigate or launched_here,
+                                                   idempotency_key=idempotency_key))
+            except Exception as e:
+                print(f"An error occurred: {str(e)}")
+                result['error'] = str(e)
+            finally:
+                if launched_here and self.driver:
+                    print("Closing browser...")
+                    self.quit_driver()
+            
+            # Declined or never submitted: nothing was charged, so the job may run again.
+            # A crash mid-payment leaves it pending for a manual check.
+            if idempotency_key and (not payment_started or result['status'] in ('error', 'form_failed')):
+                with self.open_journal() as journal:
+                    journal.finish_job(idempotency_key, 'failed', result['error'])
         
-        # Save workbook
-        workbook.save(excel_file)
-        print(f"Transaction saved to {excel_file}")
+        result['run_id'] = self.timer.run_id
+        result['timings'] = self.timer.durations()
+        return result
+    
+    def new_run(self):
+        """Start a fresh timing run (one per top-up when a browser serves several)"""
+        self.timer = RunTimer(self.settings.timings_file, self.monitor)
+    
+    def quit_driver(self):
+        """Close the browser (if any) and stop sampling it"""
+        self.monitor.detach()
+        if self.driver:
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
+    
+    def resource_pressure(self):
+        """Why the browser should be recycled before the next top-up (browser_settings.monitor), or None"""
+        return self.monitor.over_threshold()
+    
+    def browser_alive(self):
+        """Whether the driver still answers commands"""
+        try:
+            self.driver.current_url
+            return True
+        except (WebDriverException, AttributeError):
+            return False
     
-    def run(self):
-        """Main execution method"""
+    def run(self, card_name=None, amount=None):
+        """Interactive front end: dialogs for whatever wasn't given, then top_up() and a result box.
+        
+        Returns the top_up() result (status 'failed' if the run itself crashed),
+        or None when the dialogs were cancelled.
+        """
         if not self.config:
-            return
+            return None
+        
+        # Start the browser while the dialogs are open
+        warmup = None
+        if self.settings.overlapped_startup:
+            warmup = BrowserWarmup(self)
+            warmup.start()
         
         try:
-            # Show card selection popup
-            self.selected_card = self.show_card_selection()
-            if not self.selected_card:
-                print("No card selected. Exiting...")
-                return
+            with self.timer.span('dialogs') as span:
+                # Show card selection popup
+                if card_name is None:
+                    self.selected_card = self.show_card_selection()
+                    card_name = self.selected_card.name if self.selected_card else None
+                
+                # Get payment amount
+                if amount is None and card_name:
+                    amount = self.get_payment_amount()
+                if not card_name or not amount:
+                    span.outcome = 'cancelled'
             
-            # Get payment amount
-            amount = self.get_payment_amount()
+            if not card_name:
+                print("No card selected. Exiting...")
+                return None
             if not amount:
                 print("No amount entered. Exiting...")
-                return
+                return None
             
-            print(f"Selected card: {self.selected_card['name']}")
+            print(f"Selected card: {card_name}")
             print(f"Payment amount: ${amount}")
             
-            # Setup WebDriver
-            print("Setting up browser...")
-            self.setup_driver()
-            
-            # Fill payment form
-            print("Filling payment form...")
-            if self.fill_payment_form(amount):
-                print("Form submitted successfully!")
-                
-                # Capture confirmation
-                print("Capturing confirmation...")
-                confirmation_message, transaction_id = self.capture_confirmation()
-                
-                # Save to Excel
-                print("Saving transaction to Excel...")
-                self.save_to_excel(amount, confirmation_message, transaction_id)
-                
-                print("Payment automation completed successfully!")
-                messagebox.showinfo("Success", 
-                    f"Payment processed successfully!\nTransaction ID: {transaction_id}")
-            else:
-                print("Failed to fill payment form.")
-                messagebox.showerror("Error", "Failed to fill payment form.")
+            # Hand the warmed-up browser over (top_up() launches one itself otherwise)
+            page_loaded = False
+            if warmup:
+                print("Waiting for browser warm-up to finish...")
+                with self.timer.span('warmup_wait'):
+                    page_loaded = warmup.wait()
+            
+            # Fill, submit, confirm and record the payment
+            result = self.top_up(card_name, amount, navigate=not page_loaded)
+            self.show_payment_result(result)
+            return result
                 
         except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            self.report_error(f"An error occurred: {str(e)}")
+            return {'status': 'failed', 'message': '', 'transaction_id': "N/A", 'error': str(e),
+                    'card': card_name, 'amount': amount, 'run_id': self.timer.run_id,
+                    'timings': self.timer.durations()}
             
         finally:
-            # Close browser
+            # Stop a warm-up the user cancelled out of, then close browser
+            if warmup:
+                warmup.cancel()
             if self.driver:
                 print("Closing browser...")
-                self.driver.quit()
+                self.quit_driver()
 
 
 def main():
-    """Main entry point"""
+    """Main entry point (same options as ``python cli.py run``)"""
+    import argparse
+    from cli import add_run_arguments, command_run
+    
+    parser = argparse.ArgumentParser(description="FoodPanda PandaPay top-up automation")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    add_run_arguments(parser)
+    args = parser.parse_args()
     print("Starting Payment Automation...")
-    app = PaymentAutomation()
-    app.run()
+    return command_run(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Keeps the FoodPanda login alive between runs.
+
+Two modes, chosen with ``session.mode`` in config.json:
+
+* ``profile`` - the browser runs on a dedicated, persistent profile
+  directory (one per backend), so cookies and storage survive on their own.
+* ``cookies`` - the browser starts fresh, and the cookie jar saved after the
+  last login is loaded back in before the first navigation.
+
+Either way the session is checked on the top-up page the run loads anyway,
+and the full login only happens when that page asks for one.
+"""
+import json
+import os
+from urllib.parse import urlparse
+
+
+DEFAULT_SESSION_SETTINGS = {
+    'mode': 'off',
+    'profile_dir': 'browser_profile',
+    'cookie_file': 'session_cookies.json',
+}
+
+
+class SessionCache:
+    """Persistent browser profile or saved cookie jar for the configured site"""
+
+    def __init__(self, settings, url):
+        self.settings = {**DEFAULT_SESSION_SETTINGS, **(settings or {})}
+        self.mode = self.settings['mode']
+        self.url = url
+        if self.mode not in ('off', 'profile', 'cookies'):
+            raise ValueError(f"Unknown session mode '{self.mode}' (expected off, profile or cookies)")
+
+    def profile_path(self, backend):
+        """Profile directory for ``backend`` in profile mode, otherwise None"""
+        if self.mode != 'profile':
+            return None
+        path = os.path.abspath(os.path.join(self.settings['profile_dir'], backend))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def restore(self, driver):
+        """Load saved cookies into a fresh browser; returns how many were restored"""
+        if self.mode != 'cookies':
+            return 0
+        try:
+            with open(self.settings['cookie_file'], 'r') as file:
+                cookies = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+
+        # Cookies can only be set for the site currently loaded; robots.txt is the cheapest page there
+        parsed = urlparse(self.url)
+        driver.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+        host = parsed.hostname or ''
+        restored = 0
+        for cookie in cookies:
+            domain = cookie.get('domain', '').lstrip('.')
+            if domain and not (host == domain or host.endswith('.' + domain)):
+                continue
+            if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+                restored += 1
+            except Exception:
+                continue
+        return restored
+
+    def save(self, driver):
+        """Persist the current cookies after a successful login (cookies mode only)"""
+        if self.mode != 'cookies':
+            return
+        cookie_file = self.settings['cookie_file']
+        temp_file = cookie_file + '.tmp'
+        # Session cookies are credentials: keep the file private to this user
+        descriptor = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(driver.get_cookies(), file)
+        os.replace(temp_file, cookie_file)
+
+    def clear(self):
+        """Forget a saved cookie jar that turned out to be expired"""
+        if self.mode == 'cookies' and os.path.exists(self.settings['cookie_file']):
+            os.remove(self.settings['cookie_file'])
@@ -0,0 +1,240 @@
+"""Typed, validated snapshot of config.json.
+
+load_settings() checks every section up front and compiles the selector
+schema into (By, value) locators. Bad values are all reported together
+before any browser starts, instead of as a timeout halfway through a
+payment. That covers a jQuery-only ``:contains()`` selector, an unknown
+backend and a malformed card.
+
+Snapshots are cached by the SHA-256 fingerprint of the file. Reloading an
+unchanged config, as every benchmark run and browser restart does, costs
+one read and one hash.
+"""
+import hashlib
+import json
+import os
+import re
+
+from backend_state import BACKENDS, DEFAULT_STATE_FILE
+from driver_cache import DEFAULT_CACHE_DIR
+from driver_log import driver_log_settings
+from fast_load import fast_load_settings
+from ledger import DEFAULT_JOURNAL_FILE
+from locators import load_selector_schema
+from monitor import monitor_settings
+from session import SessionCache
+from timing import DEFAULT_TIMINGS_FILE
+from waits import DEFAULT_POLL_INTERVAL, DEFAULT_TIMEOUTS
+
+
+FILL_MODES = ('sequential', 'batched')
+# Selector names the automation looks up; each must be defined (optional ones may be "required": false)
+REQUIRED_SELECTORS = ('login_email', 'login_password', 'login_button', 'amount_input', 'credit_card_option',
+                      'card_number', 'expiry_date', 'cvc', 'cardholder_name', 'pay_button',
+                      'confirmation_message')
+DEFAULT_HOLDER_NAME = 'John Doe'
+# The ``daemon`` section (see daemon.py)
+DEFAULT_DAEMON_SETTINGS = {
+    'host': '127.0.0.1',
+    'port': 8766,
+    'max_requests': 50,
+    'token_file': '.daemon_token',
+    'client_timeout': 300,
+}
+
+# Fingerprint-keyed snapshots, per absolute config path
+_cache = {}
+
+
+class ConfigError(ValueError):
+    """config.json is unusable; ``problems`` lists everything that is wrong with it"""
+
+    def __init__(self, path, problems):
+        self.path = path
+        self.problems = problems
+        super().__init__(f"{path}: " + "; ".join(problems))
+
+
+class Card:
+    """One payment card from the ``cards`` list"""
+
+    def __init__(self, name, number, expiry, cvc, holder_name=DEFAULT_HOLDER_NAME):
+        self.name = name
+        self.number = number
+        self.expiry = expiry
+        self.cvc = cvc
+        self.holder_name = holder_name
+
+    @property
+    def masked_number(self):
+        return f"****-****-****-{self.number[-4:]}"
+
+    def __repr__(self):
+        return f"Card({self.name!r}, {self.masked_number})"
+
+
+class Settings:
+    """Everything the automation reads from config.json, checked and converted once.
+
+    ``raw`` is the parsed JSON, for the few tools that rewrite and save it.
+    """
+
+    def __init__(self, path, raw, fingerprint):
+        self.path = path
+        self.raw = raw
+        self.fingerprint = fingerprint
+        problems = []
+
+        website = _section(raw, 'website', problems, required=True)
+        self.url = website.get('url', '')
+        if not re.match(r'https?://', self.url or ''):
+            problems.append(f"website.url must be an http(s) URL, not {self.url!r}")
+        self.fill_mode = website.get('fill_mode', 'sequential')
+        if self.fill_mode not in FILL_MODES:
+            problems.append(f"website.fill_mode must be one of {', '.join(FILL_MODES)}, not {self.fill_mode!r}")
+        self.selectors = {}
+        selectors = _section(website, 'selectors', problems, 'website.')
+        for name, entry in selectors.items():
+            try:
+                self.selectors.update(load_selector_schema({name: entry}))
+            except (ValueError, AttributeError, TypeError) as e:
+                problems.append(f"website.selectors: {e}")
+        missing = [name for name in REQUIRED_SELECTORS if name not in selectors]
+        if missing:
+            problems.append(f"website.selectors is missing {', '.join(missing)}")
+
+        self.cards = {}
+        cards = raw.get('cards') or []
+        if not isinstance(cards, list):
+            problems.append(f"cards must be a list, not {cards!r}")
+            cards = []
+        for index, entry in enumerate(cards):
+            card = _parse_card(index, entry, problems)
+            if card and card.name in self.cards:
+                problems.append(f"cards[{index}]: duplicate card name {card.name!r}")
+            elif card:
+                self.cards[card.name] = card
+        if not cards:
+            problems.append("No cards configured")
+
+        login = _section(raw, 'foodpanda_login', problems)
+        self.login_email = login.get('email', '')
+        self.login_password = login.get('password', '')
+
+        browser = _section(raw, 'browser_settings', problems, required=True)
+        self.backend = browser.get('backend', 'auto')
+        if self.backend not in ('auto',) + BACKENDS:
+            problems.append(f"browser_settings.backend must be auto, {' or '.join(BACKENDS)}, not {self.backend!r}")
+        self.headless = bool(browser.get('headless', False))
+        self.window_size = browser.get('window_size', [1920, 1080])
+        if (not isinstance(self.window_size, list) or len(self.window_size) != 2
+                or not all(isinstance(size, int) and size > 0 for size in self.window_size)):
+            problems.append(f"browser_settings.window_size must be [width, height], not {self.window_size!r}")
+        self.implicit_wait = _number(browser, 'implicit_wait', 0, 'browser_settings', problems)
+        self.overlapped_startup = bool(browser.get('overlapped_startup', False))
+        self.browser_settings = browser
+        # Each helper reads its own sub-object; a sub-object of the wrong type is reported once, here
+        for key, parse in (('fast_load', fast_load_settings), ('driver_log', driver_log_settings),
+                           ('monitor', monitor_settings)):
+            setattr(self, key, None)
+            section = _section(browser, key, problems, 'browser_settings.')
+            try:
+                setattr(self, key, parse({key: section}))
+            except ValueError as e:
+                problems.append(f"browser_settings.{key}: {e}")
+
+        self.waits = _section(raw, 'waits', problems)
+        for step in ('poll_interval',) + tuple(DEFAULT_TIMEOUTS):
+            default = DEFAULT_POLL_INTERVAL if step == 'poll_interval' else DEFAULT_TIMEOUTS[step]
+            _number(self.waits, step, default, 'waits', problems)
+
+        self.session = _section(raw, 'session', problems)
+        try:
+            SessionCache(self.session, self.url)
+        except ValueError as e:
+            problems.append(f"session: {e}")
+
+        ledger = _section(raw, 'ledger', problems)
+        self.journal_file = ledger.get('journal_file', DEFAULT_JOURNAL_FILE)
+        self.export_after_save = bool(ledger.get('export_after_save', False))
+        self.excel_file = raw.get('excel_file', 'transactions.xlsx')
+        self.timings_file = raw.get('timings_file', DEFAULT_TIMINGS_FILE)
+        self.driver_cache_dir = raw.get('driver_cache_dir', DEFAULT_CACHE_DIR)
+        self.browser_state_file = raw.get('browser_state_file', DEFAULT_STATE_FILE)
+
+        self.daemon = {**DEFAULT_DAEMON_SETTINGS, **_section(raw, 'daemon', problems)}
+        for key in ('host', 'token_file'):
+            if not isinstance(self.daemon[key], str) or not self.daemon[key]:
+                problems.append(f"daemon.{key} must be a non-empty string, not {self.daemon[key]!r}")
+        port = self.daemon['port']
+        if isinstance(port, bool) or not isinstance(port, int) or not 1 <= port <= 65535:
+            problems.append(f"daemon.port must be an integer from 1 to 65535, not {port!r}")
+        max_requests = self.daemon['max_requests']
+        if isinstance(max_requests, bool) or not isinstance(max_requests, int) or max_requests < 1:
+            problems.append(f"daemon.max_requests must be a positive integer, not {max_requests!r}")
+        if not _number(self.daemon, 'client_timeout', DEFAULT_DAEMON_SETTINGS['client_timeout'], 'daemon', problems):
+            problems.append("daemon.client_timeout must be more than 0 seconds")
+
+        if problems:
+            raise ConfigError(path, problems)
+
+
+def _section(parent, key, problems, prefix='', required=False):
+    """``parent[key]`` as a dict; a missing optional section is {}, anything that isn't an object is a problem"""
+    value = parent.get(key)
+    if value is None and not required:
+        return {}
+    if not isinstance(value, dict):
+        problems.append(f"Missing '{prefix}{key}' section" if value is None
+                        else f"{prefix}{key} must be an object, not {value!r}")
+        return {}
+    return value
+
+
+def _number(section, key, default, section_name, problems):
+    value = section.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        problems.append(f"{section_name}.{key} must be a non-negative number, not {value!r}")
+        return default
+    return value
+
+
+def _parse_card(index, entry, problems):
+    if not isinstance(entry, dict):
+        problems.append(f"cards[{index}] must be an object")
+        return None
+    missing = [key for key in ('name', 'number', 'expiry', 'cvc') if not entry.get(key)]
+    if missing:
+        problems.append(f"cards[{index}] is missing {', '.join(missing)}")
+        return None
+    label = f"cards[{index}] ({entry['name']})"
+    number = str(entry['number']).replace(' ', '')
+    if not re.fullmatch(r'\d{12,19}', number):
+        problems.append(f"{label}: number must be 12-19 digits")
+    if not re.fullmatch(r'(0[1-9]|1[0-2])/\d{2}', str(entry['expiry'])):
+        problems.append(f"{label}: expiry must be MM/YY, not {entry['expiry']!r}")
+    if not re.fullmatch(r'\d{3,4}', str(entry['cvc'])):
+        problems.append(f"{label}: cvc must be 3 or 4 digits")
+    return Card(entry['name'], number, str(entry['expiry']), str(entry['cvc']),
+                entry.get('holder_name') or DEFAULT_HOLDER_NAME)
+
+
+def load_settings(path='config.json'):
+    """Read, validate and cache config.json; raises ConfigError (or OSError) when it can't be used"""
+    with open(path, 'rb') as file:
+        content = file.read()
+    fingerprint = hashlib.sha256(content).hexdigest()
+    key = os.path.abspath(path)
+    cached = _cache.get(key)
+    if cached and cached.fingerprint == fingerprint:
+        return cached
+
+    try:
+        raw = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ConfigError(path, [f"Invalid JSON: {e}"])
+    if not isinstance(raw, dict):
+        raise ConfigError(path, ["The top level must be a JSON object"])
+    settings = Settings(path, raw, fingerprint)
+    _cache[key] = settings
+    return settings
@@ -1,83 +1,322 @@
-import requests
-import zipfile
+"""Populate the local WebDriver cache (see driver_cache.py).
+
+ChromeDriver candidates are probed concurrently with HEAD requests. The
+winning archive is streamed to disk while it is hashed and checked against
+the checksum the server publishes: the GCS ``x-goog-hash`` MD5 for
+ChromeDriver, the release asset digest for geckodriver. Archives are kept
+in the cache and reused while their recorded SHA-256 still matches.
+``--mirror URL`` points every download at a stand-in server, for testing::
+
+    python setup_chromedriver.py --mirror http://127.0.0.1:8000
+"""
+import argparse
+import base64
+import hashlib
 import os
-import json
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from driver_cache import DriverCache, DEFAULT_CACHE_DIR, current_platform, detect_browser_major, executable_name
+
+
+# Download hosts; --mirror replaces each with <mirror>/<key>
+DOWNLOAD_SOURCES = {
+    'chrome-for-testing': "https://storage.googleapis.com/chrome-for-testing-public",
+    'chromedriver-legacy': "https://chromedriver.storage.googleapis.com",
+    'geckodriver': "https://github.com/mozilla/geckodriver/releases/download",
+    'geckodriver-api': "https://api.github.com/repos/mozilla/geckodriver/releases",
+}
+
+# ChromeDriver versions to look for, most preferred first
+CHROMEDRIVER_VERSIONS = [
+    "132.0.6834.83",
+    "132.0.6834.15",
+    "131.0.6778.108",
+    "131.0.6778.85",
+    "130.0.6723.116",
+]
+
+# Old-style chromedriver.storage.googleapis.com archive names per platform
+LEGACY_CHROMEDRIVER_PLATFORMS = {
+    'win32': 'win32',
+    'win64': 'win32',
+    'linux64': 'linux64',
+    'mac-x64': 'mac64',
+    'mac-arm64': 'mac_arm64',
+}
+
+# geckodriver release asset suffixes per platform
+GECKODRIVER_PLATFORMS = {
+    'win32': 'win32.zip',
+    'win64': 'win64.zip',
+    'linux64': 'linux64.tar.gz',
+    'mac-x64': 'macos.tar.gz',
+    'mac-arm64': 'macos-aarch64.tar.gz',
+}
+GECKODRIVER_FALLBACK_VERSION = "0.35.0"
+
+PROBE_TIMEOUT = 10
+DOWNLOAD_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+MAX_PROBE_WORKERS = 8
+
+
+class ChecksumError(Exception):
+    """A downloaded or cached archive doesn't match its published checksum"""
+
 
-def download_chromedriver():
-    """Download ChromeDriver for Windows"""
+def mirror_sources(mirror):
+    """DOWNLOAD_SOURCES with every host replaced by ``mirror``"""
+    if not mirror:
+        return dict(DOWNLOAD_SOURCES)
+    return {key: f"{mirror.rstrip('/')}/{key}" for key in DOWNLOAD_SOURCES}
+
+
+def chromedriver_candidates(sources, platform_name, versions=CHROMEDRIVER_VERSIONS):
+    """(version, url) pairs in preference order: each version's new URL format before the old one.
+
+    Versions built for the installed Chrome's major version go first.
+    """
+    chrome_major = detect_browser_major('chrome')
+    versions = sorted(versions, key=lambda version: version.split('.')[0] != chrome_major)
+    legacy_platform = LEGACY_CHROMEDRIVER_PLATFORMS[platform_name]
+    candidates = []
+    for version in versions:
+        candidates.append((version, f"{sources['chrome-for-testing']}/{version}/{platform_name}/"
+                                    f"chromedriver-{platform_name}.zip"))
+        candidates.append((version, f"{sources['chromedriver-legacy']}/{version}/chromedriver_{legacy_platform}.zip"))
+    return candidates
+
+
+def _probe(url):
+    """Response headers if ``url`` exists, else None (one HEAD request, no body)"""
     try:
-        # Try the very latest ChromeDriver versions that might support Chrome 139
-        versions_to_try = [
-            "132.0.6834.83",  # Very latest
-            "132.0.6834.15",  # Latest beta
-            "131.0.6778.108", # Latest stable
-            "131.0.6778.85",  # Previous stable
-            "130.0.6723.116", # Older stable
-        ]
-        
-        for version in versions_to_try:
-            try:
-                print(f"Trying ChromeDriver version {version}...")
-                # Try new ChromeDriver URL format first
-                download_url = f"https://storage.googleapis.com/chrome-for-testing-public/{version}/win32/chromedriver-win32.zip"
-                
-                response = requests.get(download_url)
-                if response.status_code == 200:
-                    print(f"Downloading ChromeDriver {version}...")
-                    
-                    # Save the zip file
-                    with open("chromedriver.zip", "wb") as f:
-                        f.write(response.content)
-                    print("ChromeDriver downloaded successfully!")
-                    
-                    # Extract the zip file
-                    with zipfile.ZipFile("chromedriver.zip", "r") as zip_ref:
-                        zip_ref.extractall(".")
-                    
-                    # Move chromedriver.exe from subfolder if needed
-                    if os.path.exists("chromedriver-win32/chromedriver.exe"):
-                        import shutil
-                        shutil.move("chromedriver-win32/chromedriver.exe", "chromedriver.exe")
-                        shutil.rmtree("chromedriver-win32")
-                    
-                    # Clean up
-                    os.remove("chromedriver.zip")
-                    print(f"ChromeDriver {version} extracted and ready to use!")
-                    
-                    return True
-                else:
-                    # Try old URL format
-                    old_url = f"https://chromedriver.storage.googleapis.com/{version}/chromedriver_win32.zip"
-                    response = requests.get(old_url)
-                    if response.status_code == 200:
-                        with open("chromedriver.zip", "wb") as f:
-                            f.write(response.content)
-                        
-                        with zipfile.ZipFile("chromedriver.zip", "r") as zip_ref:
-                            zip_ref.extractall(".")
-                        
-                        os.remove("chromedriver.zip")
-                        print(f"ChromeDriver {version} downloaded successfully!")
-                        return True
-                    
-            except Exception as e:
-                print(f"Failed to download version {version}: {e}")
-                continue
-        
-        print("All ChromeDriver versions failed. Trying fallback...")
-        return False
-            
+        response = requests.head(url, allow_redirects=True, timeout=PROBE_TIMEOUT)
+    except requests.RequestException:
+        return None
+    return response.headers if response.status_code == 200 else None
+
+
+def probe_first_available(candidates):
+    """The first (version, url, headers) in ``candidates`` that exists; all are probed at once"""
+    if not candidates:
+        return None
+    with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(candidates))) as executor:
+        results = list(executor.map(_probe, [url for _, url in candidates]))
+    for (version, url), headers in zip(candidates, results):
+        if headers is not None:
+            return version, url, headers
+    return None
+
+
+def published_md5(headers):
+    """Hex MD5 from a GCS ``x-goog-hash: crc32c=...,md5=<base64>`` header, or None"""
+    for part in headers.get('x-goog-hash', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name == 'md5' and value:
+            return base64.b64decode(value).hex()
+    return None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stream_download(url, target, expected_md5=None, expected_sha256=None):
+    """Stream ``url`` into ``target`` while hashing it; returns the SHA-256.
+
+    The file only appears at ``target`` once every published checksum matched.
+    """
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    partial = target + '.part'
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            expected_size = response.headers.get('Content-Length')
+            expected_md5 = expected_md5 or published_md5(response.headers)
+            size = 0
+            with open(partial, 'wb') as file:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    file.write(chunk)
+                    md5.update(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+
+        if expected_size and size != int(expected_size):
+            raise ChecksumError(f"expected {expected_size} bytes, got {size}")
+        if expected_md5 and md5.hexdigest() != expected_md5:
+            raise ChecksumError(f"MD5 {md5.hexdigest()} does not match the published {expected_md5}")
+        if expected_sha256 and sha256.hexdigest() != expected_sha256:
+            raise ChecksumError(f"SHA-256 {sha256.hexdigest()} does not match the published {expected_sha256}")
+        if not (expected_md5 or expected_sha256):
+            print("  (the server published no checksum; recording the SHA-256 only)")
+        os.replace(partial, target)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return sha256.hexdigest()
+
+
+def fetch_archive(cache, url, archive_name, expected_md5=None, expected_sha256=None):
+    """Path to a verified copy of the archive, reusing the cached one when its checksum still matches"""
+    target = cache.archive_path(archive_name)
+    recorded = cache.archive_checksum(archive_name)
+    if os.path.exists(target) and recorded:
+        if file_sha256(target) == recorded and expected_sha256 in (None, recorded):
+            print(f"Reusing cached archive {archive_name}")
+            return target
+        print(f"Cached archive {archive_name} failed its checksum, downloading again")
+
+    print(f"Downloading {url}...")
+    sha256 = stream_download(url, target, expected_md5, expected_sha256)
+    cache.record_archive(archive_name, sha256, url)
+    return target
+
+
+def _extract_binary(archive_path, binary_name, target_dir):
+    """Pull the driver executable out of a .zip or .tar.gz archive, wherever it sits inside"""
+    target = os.path.join(target_dir, binary_name)
+    if archive_path.endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as zip_ref:
+            member = next(name for name in zip_ref.namelist() if os.path.basename(name) == binary_name)
+            with zip_ref.open(member) as source, open(target, "wb") as f:
+                shutil.copyfileobj(source, f)
+    else:
+        with tarfile.open(archive_path, mode="r:gz") as tar_ref:
+            member = next(m for m in tar_ref.getmembers() if os.path.basename(m.name) == binary_name)
+            with tar_ref.extractfile(member) as source, open(target, "wb") as f:
+                shutil.copyfileobj(source, f)
+    return target
+
+
+def _install_from_archive(cache, driver, version, archive, browser_major=None):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        binary = _extract_binary(archive, executable_name(driver), temp_dir)
+        return cache.install(driver, version, binary, browser_major=browser_major)
+
+
+def download_chromedriver(cache, refresh=False, sources=DOWNLOAD_SOURCES):
+    """Download ChromeDriver for this platform into the driver cache"""
+    platform_name = current_platform()
+    if cache.entries('chromedriver') and not refresh:
+        print("ChromeDriver already cached (use --refresh to download again).")
+        return True
+
+    try:
+        candidates = chromedriver_candidates(sources, platform_name)
+        print(f"Probing {len(candidates)} ChromeDriver downloads ({platform_name})...")
+        found = probe_first_available(candidates)
+        if not found:
+            print("No ChromeDriver candidate is available for download.")
+            return False
+
+        version, url, headers = found
+        print(f"Found ChromeDriver {version}")
+        archive = fetch_archive(cache, url, f"chromedriver-{version}-{platform_name}.zip", published_md5(headers))
+        path = _install_from_archive(cache, 'chromedriver', version, archive, browser_major=version.split('.')[0])
+        print(f"ChromeDriver {version} cached at {path}")
+        return True
+
     except Exception as e:
         print(f"Error downloading ChromeDriver: {e}")
         return False
 
-if __name__ == "__main__":
-    success = download_chromedriver()
+
+def _latest_geckodriver_release(sources, asset_suffix):
+    """(version, asset URL or None, sha256 or None) of the newest geckodriver release"""
+    try:
+        response = requests.get(f"{sources['geckodriver-api']}/latest", timeout=PROBE_TIMEOUT)
+        if response.status_code == 200:
+            release = response.json()
+            version = release['tag_name'].lstrip('v')
+            for asset in release.get('assets', []):
+                if asset['name'].endswith(asset_suffix):
+                    # GitHub publishes asset digests as "sha256:<hex>"
+                    digest = asset.get('digest') or ''
+                    sha256 = digest.split(':', 1)[1] if digest.startswith('sha256:') else None
+                    return version, asset['browser_download_url'], sha256
+            return version, None, None
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f"Could not look up the latest geckodriver release ({e}), using {GECKODRIVER_FALLBACK_VERSION}")
+    return GECKODRIVER_FALLBACK_VERSION, None, None
+
+
+def download_geckodriver(cache, refresh=False, sources=DOWNLOAD_SOURCES):
+    """Download the latest geckodriver release for this platform into the driver cache"""
+    platform_name = current_platform()
+    if cache.entries('geckodriver') and not refresh:
+        print("geckodriver already cached (use --refresh to download again).")
+        return True
+
+    try:
+        asset_suffix = GECKODRIVER_PLATFORMS[platform_name]
+        version, url, sha256 = _latest_geckodriver_release(sources, asset_suffix)
+        asset = f"geckodriver-v{version}-{asset_suffix}"
+        url = url or f"{sources['geckodriver']}/v{version}/{asset}"
+        print(f"Found geckodriver {version} ({platform_name})")
+        archive = fetch_archive(cache, url, asset, expected_sha256=sha256)
+        path = _install_from_archive(cache, 'geckodriver', version, archive)
+        print(f"geckodriver {version} cached at {path}")
+        return True
+
+    except Exception as e:
+        print(f"Error downloading geckodriver: {e}")
+        return False
+
+
+def list_cached_drivers(cache):
+    drivers = cache.load_manifest()['drivers']
+    if not drivers:
+        print("The driver cache is empty.")
+    for entry in drivers:
+        browser = f" (browser {entry['browser_major']})" if entry.get('browser_major') else ""
+        print(f"{entry['driver']} {entry['version']} [{entry['platform']}]{browser} -> {entry['path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate the local WebDriver cache")
+    parser.add_argument('--browser', choices=['chrome', 'firefox', 'all'], default='all',
+                        help="which driver to download (default: all)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="download again even if a driver is already cached")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"driver cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--list', action='store_true', help="show the cached drivers and exit")
+    parser.add_argument('--mirror', help="download from this base URL instead of the real hosts (for testing)")
+    args = parser.parse_args()
+
+    cache = DriverCache(args.cache_dir)
+    if args.list:
+        list_cached_drivers(cache)
+        return
+
+    sources = mirror_sources(args.mirror)
+    success = False
+    if args.browser in ('firefox', 'all'):
+        success = download_geckodriver(cache, args.refresh, sources) or success
+    if args.browser in ('chrome', 'all'):
+        success = download_chromedriver(cache, args.refresh, sources) or success
+
     if success:
-        print("\nChrome driver setup complete!")
+        print("\nDriver setup complete!")
         print("You can now run: python payment_automation.py")
     else:
-        print("\nFailed to download ChromeDriver automatically.")
+        print("\nFailed to download a WebDriver automatically.")
         print("Please download ChromeDriver manually from:")
-        print("https://chromedriver.chromium.org/downloads")
-        print("Extract chromedriver.exe to this folder.")
+        print("https://googlechromelabs.github.io/chrome-for-testing/")
+        print("or geckodriver from https://github.com/mozilla/geckodriver/releases")
+
+
+if __name__ == "__main__":
+    main()
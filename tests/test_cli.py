@@ -0,0 +1,75 @@
+"""Headless entry points: bad input is rejected with the right status and exit code, before any browser starts."""
+import json
+import math
+import os
+
+import pytest
+
+import cli
+from payment_automation import EXIT_CODES, PaymentAutomation
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    with open(CONFIG_FILE, 'r') as file:
+        config = json.load(file)
+    config['ledger'] = {'journal_file': str(tmp_path / 'transactions.db')}
+    config['excel_file'] = str(tmp_path / 'transactions.xlsx')
+    config['timings_file'] = str(tmp_path / 'timings.jsonl')
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+@pytest.fixture
+def app(config_path):
+    app = PaymentAutomation(config_path, interactive=False)
+
+    def no_browser():
+        raise AssertionError("an invalid top-up must not start a browser")
+
+    app.setup_driver = no_browser
+    return app
+
+
+def card_name(app):
+    return next(iter(app.settings.cards))
+
+
+@pytest.mark.parametrize('amount', [math.nan, math.inf, -math.inf, True, 0, -5, 0.001, 100000, '500', None])
+def test_invalid_amounts_are_rejected(app, amount):
+    result = app.top_up(card_name(app), amount)
+    assert result['status'] == 'invalid'
+    assert 'Invalid amount' in result['error']
+
+
+def test_unknown_card_is_rejected(app):
+    result = app.top_up('No such card', 500)
+    assert result['status'] == 'invalid'
+    assert 'Unknown card' in result['error']
+
+
+def test_exit_codes_are_distinct_and_cover_every_status():
+    assert EXIT_CODES['success'] == 0
+    assert len(set(EXIT_CODES.values())) == len(EXIT_CODES)
+    for status in ('failed', 'invalid', 'error', 'timeout', 'form_failed', 'cancelled', 'skipped'):
+        assert EXIT_CODES[status] > 0
+
+
+@pytest.mark.parametrize('extra', [[], ['--card', 'Visa'], ['--amount', '500']])
+def test_no_gui_needs_card_and_amount(config_path, extra):
+    assert cli.main(['--config', config_path, 'run', '--no-gui'] + extra) == EXIT_CODES['invalid']
+
+
+def test_no_gui_exit_code_follows_the_top_up_status(config_path, app):
+    code = cli.main(['--config', config_path, 'run', '--no-gui', '--card', card_name(app), '--amount', '0'])
+    assert code == EXIT_CODES['invalid']
+
+
+@pytest.mark.parametrize('amount', ['nan', 'inf', 'lots'])
+def test_non_finite_amount_argument_is_a_usage_error(config_path, amount):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['--config', config_path, 'run', '--no-gui', '--card', 'Visa', '--amount', amount])
+    assert exit_info.value.code == 2
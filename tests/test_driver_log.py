@@ -0,0 +1,36 @@
+"""Driver log rotation: logs are shifted to .1, .2, ... once they outgrow max_bytes."""
+from driver_log import rotate
+
+
+def write(path, size):
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_log_under_the_limit_is_left_alone(tmp_path):
+    log = write(tmp_path / 'geckodriver.log', 100)
+    assert not rotate(log, 100, 3)
+    assert (tmp_path / 'geckodriver.log').stat().st_size == 100
+    assert not (tmp_path / 'geckodriver.log.1').exists()
+
+
+def test_missing_log_is_not_an_error(tmp_path):
+    assert not rotate(str(tmp_path / 'geckodriver.log'), 100, 3)
+
+
+def test_backups_are_shifted_and_capped(tmp_path):
+    log = tmp_path / 'geckodriver.log'
+    for size in (201, 202, 203, 204):
+        write(log, size)
+        assert rotate(str(log), 100, 2)
+
+    assert not log.exists()
+    assert (tmp_path / 'geckodriver.log.1').stat().st_size == 204
+    assert (tmp_path / 'geckodriver.log.2').stat().st_size == 203
+    assert not (tmp_path / 'geckodriver.log.3').exists()
+
+
+def test_no_backups_deletes_the_log(tmp_path):
+    log = write(tmp_path / 'geckodriver.log', 200)
+    assert rotate(log, 100, 0)
+    assert list(tmp_path.iterdir()) == []
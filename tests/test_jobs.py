@@ -0,0 +1,101 @@
+"""Job files: validation, default idempotency keys and batch runs."""
+import json
+
+import pytest
+
+from jobs import load_jobs, run_jobs
+
+
+def write_jobs(path, jobs):
+    path.write_text(json.dumps(jobs))
+    return str(path)
+
+
+class FakeAutomation:
+    """Stands in for PaymentAutomation: every top-up succeeds, the browser can be made to die"""
+
+    def __init__(self, restart_fails=False, alive=True):
+        self.driver = None
+        self.launches = 0
+        self.restart_fails = restart_fails
+        self.alive = alive
+        self.paid = []
+
+    def setup_driver(self):
+        self.launches += 1
+        if self.restart_fails and self.launches > 1:
+            raise RuntimeError("no browser")
+        self.driver = object()
+
+    def new_run(self):
+        pass
+
+    def top_up(self, card_name, amount, idempotency_key=None):
+        self.paid.append(idempotency_key)
+        return {'status': 'success', 'message': 'ok', 'transaction_id': f"T{len(self.paid)}", 'error': None,
+                'card': card_name, 'amount': amount}
+
+    def browser_alive(self):
+        return self.alive
+
+    def resource_pressure(self):
+        return None
+
+    def quit_driver(self):
+        self.driver = None
+
+
+def test_explicit_keys_are_kept(tmp_path):
+    jobs = load_jobs(write_jobs(tmp_path / 'jobs.json', [{'card': 'Visa', 'amount': 5, 'key': 'invoice-1'}]))
+    assert jobs == [{'card': 'Visa', 'amount': 5.0, 'key': 'invoice-1'}]
+
+
+def test_default_keys_are_stable_for_the_same_batch(tmp_path):
+    path = write_jobs(tmp_path / 'jobs.json', [{'card': 'Personal Visa', 'amount': 5}])
+    first = load_jobs(path)[0]['key']
+    assert load_jobs(path)[0]['key'] == first
+    assert first.startswith('jobs.json@') and first.endswith('#1-personal-visa-5')
+
+
+def test_default_keys_differ_between_batches(tmp_path):
+    entries = [{'card': 'Visa', 'amount': 5}]
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    same_name_elsewhere = load_jobs(write_jobs(tmp_path / 'b' / 'jobs.json', entries))[0]['key']
+    original = load_jobs(write_jobs(tmp_path / 'a' / 'jobs.json', entries))[0]['key']
+    next_week = load_jobs(write_jobs(tmp_path / 'a' / 'jobs.json', entries + [{'card': 'Visa', 'amount': 6}]))
+    assert len({original, same_name_elsewhere, next_week[0]['key']}) == 3
+
+
+@pytest.mark.parametrize('entry', [{'card': 'Visa'}, {'card': 'Visa', 'amount': 0},
+                                   {'card': 'Visa', 'amount': True}, {'card': 'Visa', 'amount': '5'},
+                                   {'card': 5, 'amount': 3}, {'card': '', 'amount': 3}, {'card': None, 'amount': 3}])
+def test_invalid_jobs_are_rejected(tmp_path, entry):
+    with pytest.raises(ValueError):
+        load_jobs(write_jobs(tmp_path / 'jobs.json', [entry]))
+
+
+def test_duplicate_keys_are_rejected(tmp_path):
+    entries = [{'card': 'Visa', 'amount': 5, 'key': 'k'}, {'card': 'Visa', 'amount': 6, 'key': 'k'}]
+    with pytest.raises(ValueError, match='Duplicate'):
+        load_jobs(write_jobs(tmp_path / 'jobs.json', entries))
+
+
+def test_batch_runs_every_job_on_one_browser(tmp_path):
+    jobs = load_jobs(write_jobs(tmp_path / 'jobs.json', [{'card': 'Visa', 'amount': 5}, {'card': 'Visa', 'amount': 6}]))
+    app = FakeAutomation()
+
+    results = run_jobs(app, jobs)
+    assert [result['status'] for result in results] == ['success', 'success']
+    assert app.launches == 1 and app.driver is None
+
+
+def test_failed_restart_returns_partial_results(tmp_path):
+    entries = [{'card': 'Visa', 'amount': amount} for amount in (5, 6, 7)]
+    jobs = load_jobs(write_jobs(tmp_path / 'jobs.json', entries))
+    app = FakeAutomation(restart_fails=True, alive=False)
+
+    results = run_jobs(app, jobs)
+    assert [result['status'] for result in results] == ['success', 'not_run', 'not_run']
+    assert [result['key'] for result in results] == [job['key'] for job in jobs]
+    assert app.paid == [jobs[0]['key']]
@@ -0,0 +1,133 @@
+"""Transaction journal: migrations, running totals and idempotency-keyed job states."""
+import sqlite3
+
+import pytest
+
+import ledger
+from ledger import TransactionJournal, open_journal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with TransactionJournal(str(tmp_path / 'transactions.db')) as journal:
+        yield journal
+
+
+def user_version(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_new_journal_is_fully_migrated(tmp_path):
+    path = str(tmp_path / 'transactions.db')
+    TransactionJournal(path).close()
+    assert user_version(path) == len(ledger.MIGRATIONS)
+
+
+def test_older_journal_is_upgraded_in_place(tmp_path):
+    path = str(tmp_path / 'transactions.db')
+    connection = sqlite3.connect(path)
+    for version, script in enumerate(ledger.MIGRATIONS[:2], start=1):
+        connection.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+    connection.execute("INSERT INTO transactions (date, time, card_name, amount, transaction_id, "
+                       "confirmation_message) VALUES ('2025-03-01', '10:00:00', 'Visa', 100, 'T1', 'ok')")
+    connection.commit()
+    connection.close()
+
+    with TransactionJournal(path) as journal:
+        assert journal.count() == 1
+        assert journal.claim_job('key-1', 'Visa', 50) is None
+    assert user_version(path) == len(ledger.MIGRATIONS)
+
+
+def test_record_updates_running_totals(journal):
+    journal.record('2025-03-01', '10:00:00', 'Visa', 100.0, 'T1', 'ok')
+    journal.record('2025-03-02', '11:00:00', 'Visa', 50.0, 'T2', 'ok')
+    journal.record('2025-04-01', '09:00:00', 'Mastercard', 25.0, 'T3', 'ok')
+
+    assert journal.spend_totals('card') == [('', 'Mastercard', 1, 25.0), ('', 'Visa', 2, 150.0)]
+    assert journal.spend_totals('month', period='2025-03') == [('2025-03', 'Visa', 2, 150.0)]
+    assert [row[4] for row in journal.find_transaction('T2')] == ['T2']
+
+
+def test_new_key_is_claimed_pending(journal):
+    assert journal.claim_job('key-1', 'Visa', 50) is None
+    assert [row[3] for row in journal.jobs()] == ['pending']
+
+
+@pytest.mark.parametrize('status', ['pending', 'done', 'unconfirmed'])
+def test_key_that_may_have_paid_is_not_claimed_again(journal, status):
+    journal.claim_job('key-1', 'Visa', 50)
+    journal.finish_job('key-1', status)
+
+    assert journal.claim_job('key-1', 'Visa', 50) == status
+    key, _, _, current, attempts, _, _ = journal.jobs()[0]
+    assert (current, attempts) == (status, 1)
+
+
+def test_failed_key_is_claimed_again(journal):
+    journal.claim_job('key-1', 'Visa', 50)
+    journal.finish_job('key-1', 'failed', 'declined')
+
+    assert journal.claim_job('key-1', 'Visa', 50) == 'failed'
+    _, _, _, status, attempts, _, error = journal.jobs()[0]
+    assert (status, attempts, error) == ('pending', 2, None)
+
+
+def test_record_settles_the_job_in_the_same_commit(journal):
+    journal.claim_job('key-1', 'Visa', 50)
+    row = journal.record('2025-03-01', '10:00:00', 'Visa', 50.0, 'T1', 'ok', 'key-1', 'unconfirmed')
+
+    assert journal.jobs('unconfirmed')[0][0] == 'key-1'
+    transaction_row = journal.connection.execute(
+        "SELECT transaction_row FROM jobs WHERE idempotency_key = 'key-1'").fetchone()[0]
+    assert transaction_row == row
+
+
+def test_resolving_an_unconfirmed_job_as_failed_voids_its_transaction(journal):
+    journal.record('2025-03-01', '09:00:00', 'Visa', 20.0, 'T0', 'ok')
+    journal.claim_job('key-1', 'Visa', 50)
+    journal.record('2025-03-01', '10:00:00', 'Visa', 50.0, 'T1', 'ok', 'key-1', 'unconfirmed')
+
+    assert journal.resolve_job('key-1', 'failed')
+
+    assert journal.jobs('failed')[0][0] == 'key-1'
+    assert journal.count() == 1
+    assert [row[4] for row in journal.rows()] == ['T0']
+    assert journal.find_transaction('T1')[0][6] is not None
+    assert journal.spend_totals('card') == [('', 'Visa', 1, 20.0)]
+    assert journal.spend_totals('day') == [('2025-03-01', 'Visa', 1, 20.0)]
+    assert journal.spend_totals('month') == [('2025-03', 'Visa', 1, 20.0)]
+    journal._rebuild_totals()
+    assert journal.spend_totals('card') == [('', 'Visa', 1, 20.0)]
+    # Voiding twice must not subtract twice
+    assert journal.resolve_job('key-1', 'failed')
+    assert journal.spend_totals('card') == [('', 'Visa', 1, 20.0)]
+
+
+def test_unknown_job_status_is_rejected(journal):
+    with pytest.raises(ValueError):
+        journal.finish_job('key-1', 'paid')
+
+
+def test_failed_legacy_import_leaves_no_journal_behind(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    excel_file = str(tmp_path / 'transactions.xlsx')
+    journal_file = str(tmp_path / 'transactions.db')
+    workbook = openpyxl.Workbook()
+    workbook.active.append(ledger.EXCEL_HEADERS)
+    workbook.active.append(['2025-03-01', '10:00:00', 'Visa', 100, 'T1', 'ok'])
+    workbook.active.append(['2025-03-02', '10:00:00', 'Visa', 'a lot', 'T2', 'ok'])
+    workbook.save(excel_file)
+
+    with pytest.raises(ValueError, match='row 3'):
+        open_journal(journal_file, excel_file)
+    assert not (tmp_path / 'transactions.db').exists()
+
+    workbook.active.cell(row=3, column=4).value = 50
+    workbook.save(excel_file)
+    with open_journal(journal_file, excel_file) as journal:
+        assert journal.count() == 2
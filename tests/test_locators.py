@@ -0,0 +1,49 @@
+"""Selector schema parsing and the locator checks run at config load."""
+import pytest
+
+from locators import SelectorSpec, load_selector_schema, locator_problem
+
+
+def test_string_selector_is_a_required_css_locator():
+    spec = SelectorSpec.from_config('pay_button', "button[type='submit']")
+    assert spec.locators == [('css selector', "button[type='submit']")]
+    assert spec.required and spec.timeout == 10
+
+
+def test_object_selector_with_fallbacks_and_options():
+    spec = SelectorSpec.from_config('pay_button', {
+        'locators': [{'xpath': "//button[contains(text(), 'Pay')]"}, {'css': 'button.pay'}],
+        'required': False, 'key_events': True,
+    })
+    assert [by for by, _ in spec.locators] == ['xpath', 'css selector']
+    assert not spec.required and spec.timeout == 2 and spec.key_events
+
+
+@pytest.mark.parametrize('entry', [
+    "button:contains('Pay')",
+    "input[placeholder='CVC'",
+    {'css': "button:contains('Pay')"},
+    {'xpath': "//button[contains(text(), 'Pay')"},
+    {'css': ''},
+    {'css': 'a', 'xpath': '//a'},
+    {'locators': []},
+    ['button'],
+])
+def test_broken_selectors_are_rejected_in_either_form(entry):
+    with pytest.raises(ValueError):
+        load_selector_schema({'pay_button': entry})
+
+
+@pytest.mark.parametrize('strategy, value', [
+    ('css', "input[name='card-number']"),
+    ('css', 'a[title="it\'s fine"]'),
+    ('css', 'li:first-child > a'),
+    ('xpath', "//div[@class='success-message']"),
+    ('id', 'card:number'),
+])
+def test_valid_locators_pass(strategy, value):
+    assert locator_problem(strategy, value) is None
+
+
+def test_contains_gets_an_xpath_hint():
+    assert 'xpath' in locator_problem('css', "div:contains('Paid')")
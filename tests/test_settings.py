@@ -0,0 +1,103 @@
+"""config.json validation: every problem is reported as a ConfigError before a browser starts."""
+import copy
+import json
+import os
+
+import pytest
+
+from settings import ConfigError, load_settings
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+@pytest.fixture
+def config():
+    with open(CONFIG_FILE, 'r') as file:
+        return json.load(file)
+
+
+def write(tmp_path, config):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def problems(tmp_path, config):
+    with pytest.raises(ConfigError) as error:
+        load_settings(write(tmp_path, config))
+    return error.value.problems
+
+
+def set_path(config, path, value):
+    config = copy.deepcopy(config)
+    section = config
+    for key in path[:-1]:
+        section = section[key]
+    section[path[-1]] = value
+    return config
+
+
+def test_shipped_config_is_valid():
+    settings = load_settings(CONFIG_FILE)
+    assert settings.fill_mode == 'sequential'
+    assert settings.fast_load is None
+    assert settings.cards
+
+
+def test_snapshot_is_cached_until_the_file_changes(tmp_path, config):
+    path = write(tmp_path, config)
+    first = load_settings(path)
+    assert load_settings(path) is first
+    write(tmp_path, set_path(config, ['website', 'fill_mode'], 'batched'))
+    assert load_settings(path).fill_mode == 'batched'
+
+
+@pytest.mark.parametrize('path, value', [
+    (['waits'], []),
+    (['website', 'selectors'], []),
+    (['ledger'], 'x'),
+    (['session'], 'x'),
+    (['foodpanda_login'], 1),
+    (['cards'], 5),
+    (['browser_settings', 'fast_load'], True),
+    (['browser_settings', 'fast_load'], {'enabled': True, 'page_load_strategy': 'bogus'}),
+    (['browser_settings', 'driver_log'], {'level': 'loud'}),
+    (['browser_settings', 'monitor'], {'max_rss_mb': 'lots'}),
+    (['browser_settings', 'backend'], 'safari'),
+    (['website', 'fill_mode'], 'parallel'),
+    (['website', 'url'], 'ftp://example.com'),
+    (['website', 'selectors', 'pay_button'], "button:contains('Pay')"),
+    (['waits', 'login'], -1),
+    (['daemon'], 'x'),
+    (['daemon', 'port'], '8766'),
+    (['daemon', 'port'], 70000),
+    (['daemon', 'max_requests'], 0),
+    (['daemon', 'client_timeout'], 0),
+])
+def test_bad_values_are_config_errors(tmp_path, config, path, value):
+    assert problems(tmp_path, set_path(config, path, value))
+
+
+def test_optional_sections_fall_back_to_defaults(tmp_path, config):
+    for key in ('daemon', 'ledger', 'excel_file'):
+        config.pop(key, None)
+    settings = load_settings(write(tmp_path, config))
+    assert settings.excel_file == 'transactions.xlsx'
+    assert settings.journal_file == 'transactions.db'
+    assert settings.daemon['port'] == 8766
+
+
+def test_all_problems_are_reported_together(tmp_path, config):
+    config = set_path(config, ['waits'], [])
+    config = set_path(config, ['session'], 'x')
+    config['cards'][0]['cvc'] = '12'
+    reported = problems(tmp_path, config)
+    assert len(reported) == 3
+    assert any('cvc' in problem for problem in reported)
+
+
+def test_invalid_json_is_a_config_error(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{"website": ')
+    with pytest.raises(ConfigError, match='Invalid JSON'):
+        load_settings(str(path))
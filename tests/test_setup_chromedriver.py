@@ -0,0 +1,184 @@
+"""Driver downloads against a local stand-in for the download hosts (setup_chromedriver.py --mirror)."""
+import base64
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import setup_chromedriver
+from driver_cache import DriverCache, current_platform
+from setup_chromedriver import ChecksumError, fetch_archive, mirror_sources, published_md5, stream_download
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Serves ``server.files``: path -> (body, extra headers)"""
+
+    def _respond(self, send_body):
+        self.server.requests.append((self.command, self.path))
+        if self.path not in self.server.files:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body, headers = self.server.files[self.path]
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def log_message(self, *args):
+        pass
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ArchiveHandler)
+        self.files = {}
+        self.requests = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def downloads(self):
+        return [path for command, path in self.requests if command == 'GET']
+
+
+@pytest.fixture
+def mirror():
+    server = ArchiveServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DriverCache(str(tmp_path / 'drivers'))
+
+
+def driver_zip(binary_name='chromedriver', content=b'#!/bin/sh\necho fake driver\n'):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(f'chromedriver-linux64/{binary_name}', content)
+    return buffer.getvalue()
+
+
+def goog_hash(body):
+    return {'x-goog-hash': f"crc32c=AAAAAA==,md5={base64.b64encode(hashlib.md5(body).digest()).decode()}"}
+
+
+def serve_first_chromedriver(mirror, body, headers):
+    """Put ``body`` at the URL download_chromedriver() probes first"""
+    sources = mirror_sources(mirror.url)
+    version, url = setup_chromedriver.chromedriver_candidates(sources, current_platform())[0]
+    mirror.files[url[len(mirror.url):]] = (body, headers)
+    return sources, version
+
+
+def leftover_files(cache):
+    archives = os.path.join(cache.cache_dir, 'archives')
+    return sorted(os.listdir(archives)) if os.path.isdir(archives) else []
+
+
+def test_published_md5_reads_the_goog_hash_header():
+    body = b'archive bytes'
+    assert published_md5(goog_hash(body)) == hashlib.md5(body).hexdigest()
+    assert published_md5({}) is None
+
+
+def test_download_verifies_md5_and_installs(mirror, cache):
+    body = driver_zip()
+    sources, version = serve_first_chromedriver(mirror, body, goog_hash(body))
+
+    assert setup_chromedriver.download_chromedriver(cache, sources=sources)
+    assert [entry['version'] for entry in cache.entries('chromedriver')] == [version]
+    archive_name = f"chromedriver-{version}-{current_platform()}.zip"
+    assert cache.archive_checksum(archive_name) == hashlib.sha256(body).hexdigest()
+
+
+def test_md5_mismatch_installs_nothing(mirror, cache):
+    body = driver_zip()
+    sources, _ = serve_first_chromedriver(mirror, body, goog_hash(b'something else'))
+
+    assert not setup_chromedriver.download_chromedriver(cache, sources=sources)
+    assert cache.entries('chromedriver') == []
+    assert leftover_files(cache) == []
+
+
+def test_md5_mismatch_raises_and_removes_the_partial_file(mirror, tmp_path):
+    mirror.files['/driver.zip'] = (b'payload', goog_hash(b'tampered'))
+    target = str(tmp_path / 'archives' / 'driver.zip')
+
+    with pytest.raises(ChecksumError, match='MD5'):
+        stream_download(mirror.url + '/driver.zip', target)
+    assert os.listdir(tmp_path / 'archives') == []
+
+
+def test_sha256_mismatch_raises_and_keeps_nothing(mirror, cache):
+    mirror.files['/driver.zip'] = (b'payload', {})
+
+    with pytest.raises(ChecksumError, match='SHA-256'):
+        fetch_archive(cache, mirror.url + '/driver.zip', 'driver.zip', expected_sha256='0' * 64)
+    assert leftover_files(cache) == []
+    assert cache.archive_checksum('driver.zip') is None
+
+
+def test_verified_archive_is_reused(mirror, cache):
+    body = b'payload'
+    mirror.files['/driver.zip'] = (body, goog_hash(body))
+    url = mirror.url + '/driver.zip'
+
+    first = fetch_archive(cache, url, 'driver.zip')
+    second = fetch_archive(cache, url, 'driver.zip')
+    assert first == second
+    assert mirror.downloads() == ['/driver.zip']
+
+
+def test_corrupted_cached_archive_is_downloaded_again(mirror, cache):
+    body = b'payload'
+    mirror.files['/driver.zip'] = (body, goog_hash(body))
+    url = mirror.url + '/driver.zip'
+    path = fetch_archive(cache, url, 'driver.zip')
+    with open(path, 'wb') as file:
+        file.write(b'corrupted')
+
+    fetch_archive(cache, url, 'driver.zip')
+    assert mirror.downloads() == ['/driver.zip', '/driver.zip']
+    with open(path, 'rb') as file:
+        assert file.read() == body
+
+
+def test_archive_without_the_driver_is_not_installed(mirror, cache):
+    body = driver_zip(binary_name='README')
+    sources, _ = serve_first_chromedriver(mirror, body, goog_hash(body))
+
+    assert not setup_chromedriver.download_chromedriver(cache, sources=sources)
+    assert cache.entries('chromedriver') == []
+
+
+def test_archive_that_is_not_a_zip_is_not_installed(mirror, cache):
+    body = b'<html>rate limited</html>'
+    sources, _ = serve_first_chromedriver(mirror, body, goog_hash(body))
+
+    assert not setup_chromedriver.download_chromedriver(cache, sources=sources)
+    assert cache.entries('chromedriver') == []
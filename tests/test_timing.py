@@ -0,0 +1,21 @@
+"""Nearest-rank percentiles for the timing summaries."""
+import pytest
+
+from timing import percentile
+
+
+@pytest.mark.parametrize('values, fraction, expected', [
+    ([], 0.5, 0.0),
+    ([7], 0.5, 7),
+    ([7], 0.95, 7),
+    ([1, 2], 0.5, 1),
+    ([1, 2, 3, 4], 0.5, 2),
+    ([1, 2, 3, 4, 5], 0.5, 3),
+    ([1, 2, 3, 4, 5], 0.95, 5),
+    (list(range(1, 21)), 0.95, 19),
+    (list(range(1, 21)), 0.5, 10),
+    ([1, 2, 3], 0.0, 1),
+    ([1, 2, 3], 1.0, 3),
+])
+def test_nearest_rank(values, fraction, expected):
+    assert percentile(values, fraction) == expected
@@ -0,0 +1,45 @@
+"""Committed-value checks: what a masked input shows versus what was typed."""
+import pytest
+
+from waits import field_value_committed
+
+
+class FakeInput:
+    def __init__(self, value):
+        self.value = value
+
+    def get_attribute(self, name):
+        return self.value if name == 'value' else None
+
+
+def committed(typed, shown, numeric=False):
+    return bool(field_value_committed(FakeInput(shown), typed, numeric)(None))
+
+
+def test_card_numbers_differing_past_float_precision_do_not_match():
+    # Equal as floats (both round to 4111111111111111e3), different cards
+    assert float('4111111111111111111') == float('4111111111111111112')
+    assert not committed('4111111111111111111', '4111 1111 1111 1111 112')
+    assert committed('4111111111111111111', '4111 1111 1111 1111 111')
+
+
+@pytest.mark.parametrize('shown', ['₱1,000.00', '1000', '1,000', '$1000.0'])
+def test_formatted_amounts_match_numerically(shown):
+    assert committed('1000', shown, numeric=True)
+
+
+def test_different_amounts_do_not_match():
+    assert not committed('1000', '₱100.00', numeric=True)
+
+
+@pytest.mark.parametrize('shown', ['12 / 25', '12/25', '1225'])
+def test_masked_expiry_matches(shown):
+    assert committed('12/25', shown)
+
+
+def test_wrong_expiry_does_not_match():
+    assert not committed('12/25', '12 / 26')
+
+
+def test_empty_field_is_not_committed():
+    assert not committed('12/25', None)
@@ -0,0 +1,159 @@
+"""Per-phase timing spans for each automation run.
+
+Every span becomes one JSON line in the ``timings_file`` from config.json::
+
+    {"run_id": "...", "phase": "fill.card_number", "started_at": "...",
+     "duration_ms": 412.7, "outcome": "ok", "rss_mb": 812.4, "cpu_percent": 37.5}
+
+``rss_mb`` and ``cpu_percent`` are the peaks for the driver and browser
+processes during the span, while a browser is running (see monitor.py).
+
+``python timing.py summary`` prints p50/p95 per phase across runs.
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+
+DEFAULT_TIMINGS_FILE = 'timings.jsonl'
+
+
+class Span:
+    """A phase being timed; set ``outcome`` to record a soft failure without raising"""
+
+    def __init__(self, phase, attributes):
+        self.phase = phase
+        self.attributes = attributes
+        self.outcome = 'ok'
+
+
+class RunTimer:
+    """Collects spans for one run and appends them to a JSONL file (if one is configured)"""
+
+    def __init__(self, path=DEFAULT_TIMINGS_FILE, monitor=None):
+        self.path = path
+        # Optional monitor.ResourceMonitor: each span records the browser's peak RSS and CPU
+        self.monitor = monitor
+        self.run_id = uuid.uuid4().hex[:12]
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase, **attributes):
+        span = Span(phase, attributes)
+        started_at = datetime.now()
+        started = time.perf_counter()
+        if self.monitor:
+            self.monitor.span_started()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = 'error'
+            raise
+        finally:
+            usage = self.monitor.span_usage(started) if self.monitor else None
+            if usage:
+                span.attributes.update(rss_mb=usage['rss_mb'], cpu_percent=usage['cpu_percent'])
+            self.record(phase, time.perf_counter() - started, span.outcome, started_at, **span.attributes)
+
+    def record(self, phase, duration, outcome='ok', started_at=None, **attributes):
+        """Record a span measured elsewhere (``duration`` in seconds)"""
+        entry = {
+            'run_id': self.run_id,
+            'phase': phase,
+            'started_at': (started_at or datetime.now()).isoformat(timespec='milliseconds'),
+            'duration_ms': round(duration * 1000, 1),
+            'outcome': outcome,
+            **attributes,
+        }
+        with self._lock:
+            self.spans.append(entry)
+            if self.path:
+                with open(self.path, 'a') as file:
+                    file.write(json.dumps(entry) + '\n')
+
+    def durations(self):
+        """Total milliseconds per phase for this run"""
+        totals = defaultdict(float)
+        for entry in self.spans:
+            totals[entry['phase']] += entry['duration_ms']
+        return dict(totals)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[rank - 1]
+
+
+def load_spans(path, last_runs=None):
+    spans = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+
+    if last_runs:
+        run_ids = list(dict.fromkeys(entry['run_id'] for entry in spans))[-last_runs:]
+        keep = set(run_ids)
+        spans = [entry for entry in spans if entry['run_id'] in keep]
+    return spans
+
+
+def summarize(spans):
+    """Per phase: (count, failures, p50 ms, p95 ms, peak browser MB or None), in first-seen phase order"""
+    durations = defaultdict(list)
+    failures = defaultdict(int)
+    peak_rss = {}
+    for entry in spans:
+        durations[entry['phase']].append(entry['duration_ms'])
+        if entry['outcome'] != 'ok':
+            failures[entry['phase']] += 1
+        if entry.get('rss_mb') is not None:
+            peak_rss[entry['phase']] = max(peak_rss.get(entry['phase'], 0), entry['rss_mb'])
+
+    summary = {}
+    for phase, values in durations.items():
+        values.sort()
+        summary[phase] = (len(values), failures[phase], percentile(values, 0.5), percentile(values, 0.95),
+                          peak_rss.get(phase))
+    return summary
+
+
+def print_summary(spans):
+    run_count = len({entry['run_id'] for entry in spans})
+    print(f"{run_count} runs, {len(spans)} spans")
+    print(f"{'phase':<28}{'count':>7}{'failed':>8}{'p50 ms':>11}{'p95 ms':>11}{'peak MB':>10}")
+    for phase, (count, failed, p50, p95, rss) in summarize(spans).items():
+        peak = f"{rss:>10.0f}" if rss is not None else f"{'-':>10}"
+        print(f"{phase:<28}{count:>7}{failed:>8}{p50:>11.1f}{p95:>11.1f}{peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run timing tools")
+    parser.add_argument('--file', default=DEFAULT_TIMINGS_FILE, help="timings JSONL file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summary', help="p50/p95 per phase across runs")
+    summary_parser.add_argument('--last', type=int, help="only the most recent N runs")
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        try:
+            spans = load_spans(args.file, args.last)
+        except FileNotFoundError:
+            print(f"No timings recorded yet ({args.file} not found).")
+            return
+        print_summary(spans)
+
+
+if __name__ == "__main__":
+    main()
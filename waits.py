@@ -0,0 +1,184 @@
+"""Condition-driven waits used by PaymentAutomation instead of fixed sleeps.
+
+Every wait is tied to a named step whose timeout comes from the ``waits``
+block in config.json, so a step only takes as long as the page needs.
+"""
+import re
+import time
+
+from selenium.common.exceptions import (StaleElementReferenceException,
+                                        TimeoutException,
+                                        WebDriverException)
+
+
+DEFAULT_TIMEOUTS = {
+    'field_commit': 3,
+    'network_idle': 5,
+    'login': 10,
+}
+DEFAULT_POLL_INTERVAL = 0.1
+
+# Wraps fetch and XMLHttpRequest so the page keeps a count of requests in flight
+NETWORK_TRACKER_SCRIPT = """
+if (window.__pendingRequests === undefined) {
+    window.__pendingRequests = 0;
+    var done = function () { window.__pendingRequests = Math.max(0, window.__pendingRequests - 1); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__pendingRequests++;
+            return originalFetch.apply(this, arguments).finally(done);
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__pendingRequests++;
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+}
+"""
+
+NETWORK_STATE_SCRIPT = """
+return [document.readyState,
+        window.__pendingRequests || 0,
+        window.jQuery ? window.jQuery.active : 0,
+        performance.getEntriesByType('resource').length];
+"""
+
+
+def _normalize(value, numeric=False):
+    """Strip formatting a masked input may add (spaces, slashes; commas and currency for amounts).
+
+    Only amounts are compared as numbers: card numbers have more digits than a
+    float holds exactly, so they and every other field compare as strings.
+    """
+    value = str(value or '')
+    if numeric:
+        number = re.sub(r'[^\d.]', '', value)
+        try:
+            if number and re.fullmatch(r'[\s₱$,\d.]+', value):
+                return float(number)
+        except ValueError:
+            pass
+    return re.sub(r'[^0-9A-Za-z]', '', value).lower()
+
+
+class field_value_committed:
+    """An input element holds the expected value once the page's handlers ran (``numeric`` for amounts)"""
+
+    def __init__(self, element, expected, numeric=False):
+        self.element = element
+        self.numeric = numeric
+        self.expected = _normalize(expected, numeric)
+
+    def matches(self, actual):
+        return _normalize(actual, self.numeric) == self.expected
+
+    def __call__(self, driver):
+        try:
+            actual = self.element.get_attribute('value')
+        except StaleElementReferenceException:
+            return False
+        return self.element if self.matches(actual) else False
+
+
+class first_present:
+    """The first of several locators (a fallback chain) that matches an element"""
+
+    def __init__(self, *locators):
+        self.locators = locators
+
+    def __call__(self, driver):
+        for locator in self.locators:
+            elements = driver.find_elements(*locator)
+            if elements:
+                return elements[0]
+        return False
+
+
+class first_clickable:
+    """The first of several locators that resolves to a displayed, enabled element"""
+
+    def __init__(self, *locators):
+        self.locators = locators
+
+    def __call__(self, driver):
+        for locator in self.locators:
+            for element in driver.find_elements(*locator):
+                try:
+                    if element.is_displayed() and element.is_enabled():
+                        return element
+                except StaleElementReferenceException:
+                    continue
+        return False
+
+
+class network_idle:
+    """The document is parsed and no tracked request started or finished for ``quiet_period`` seconds.
+
+    'interactive' counts as ready so eager page loads aren't held up by
+    subresources; in-flight fetch/XHR calls are what matter here.
+    """
+
+    def __init__(self, quiet_period=0.5):
+        self.quiet_period = quiet_period
+        self._last_state = None
+        self._quiet_since = None
+
+    def __call__(self, driver):
+        try:
+            ready_state, pending, jquery_active, resources = driver.execute_script(NETWORK_STATE_SCRIPT)
+        except WebDriverException:
+            return False
+
+        if ready_state == 'loading' or pending or jquery_active:
+            self._last_state = None
+            return False
+
+        now = time.monotonic()
+        if self._last_state != resources:
+            self._last_state = resources
+            self._quiet_since = now
+            return False
+        return now - self._quiet_since >= self.quiet_period
+
+
+class Waiter:
+    """Runs conditions against the driver with per-step timeouts from config"""
+
+    def __init__(self, driver, wait_settings=None):
+        settings = dict(wait_settings or {})
+        self.driver = driver
+        self.poll_interval = settings.pop('poll_interval', DEFAULT_POLL_INTERVAL)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **settings}
+
+    def timeout(self, step):
+        return self.timeouts[step]
+
+    def within(self, condition, timeout, message=''):
+        """Wait up to ``timeout`` seconds for ``condition``; raises TimeoutException"""
+        # Only reached once a driver exists, so selenium.webdriver is loaded by then
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        wait = WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval)
+        return wait.until(condition, message)
+
+    def until(self, condition, step, message=''):
+        """Wait for ``condition``; raises TimeoutException when the step's budget runs out"""
+        return self.within(condition, self.timeout(step), message or f"Timed out waiting for {step}")
+
+    def settle(self, condition, step, description):
+        """Wait for ``condition`` but carry on (with a warning) if it never holds"""
+        try:
+            return self.until(condition, step)
+        except TimeoutException:
+            print(f"⚠️ {description} did not settle within {self.timeout(step)}s, continuing...")
+            return None
+
+    def track_network(self):
+        """Install the in-page request counter used by network_idle"""
+        try:
+            self.driver.execute_script(NETWORK_TRACKER_SCRIPT)
+        except WebDriverException:
+            pass
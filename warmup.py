@@ -0,0 +1,75 @@
+"""Background browser start-up that overlaps with the Tk dialogs."""
+import threading
+
+
+class BrowserWarmup:
+    """Runs setup_driver() and the first navigation on a background thread.
+
+    The main thread keeps showing dialogs and calls wait() once it needs
+    the browser, or cancel() if the user backs out.
+    """
+
+    def __init__(self, automation):
+        self.automation = automation
+        self.error = None
+        self.navigated = False
+        self._handed_over = False
+        self._cancelled = threading.Event()
+        self._quit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._warm, name="browser-warmup", daemon=True)
+
+    def start(self):
+        print("Warming up browser in the background...")
+        self._thread.start()
+
+    def _warm(self):
+        try:
+            self.automation.setup_driver()
+        except Exception as e:
+            self.error = e
+            return
+
+        if self._cancelled.is_set():
+            self._quit_driver()
+            return
+
+        try:
+            with self.automation.timer.span('navigation', background=True):
+                self.automation.driver.get(self.automation.settings.url)
+            self.navigated = True
+        except Exception as e:
+            # The form flow will navigate again and report the failure itself
+            if not self._cancelled.is_set():
+                print(f"Background navigation failed: {e}")
+
+    def wait(self):
+        """Block until warm-up finishes; returns True if the page is already loaded"""
+        self._thread.join()
+        if self.error:
+            raise self.error
+        self._handed_over = True
+        return self.navigated
+
+    def cancel(self):
+        """Stop the warm-up and close whatever browser it has started.
+
+        Does nothing once wait() has handed the browser over to the caller.
+        """
+        if self._handed_over:
+            return
+        self._cancelled.set()
+        # Quitting aborts a navigation that is still in flight
+        self._quit_driver()
+        self._thread.join()
+        self._quit_driver()
+
+    def _quit_driver(self):
+        with self._quit_lock:
+            driver = self.automation.driver
+            self.automation.driver = None
+            self.automation.monitor.detach()
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass